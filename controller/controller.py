@@ -1,13 +1,16 @@
 import RPi.GPIO as GPIO
 import socket
+import sys
 import threading
 import time
+import maze_protocol
+import maze_udp
 
 # Button GPIO pins
 BUTTONS = {
-    27: 'w',  # Forward
-    22: 'a',  # Left
-    17: 'd',  # Right
+    27: 'forward',
+    22: 'left',
+    17: 'right',
 }
 
 # GPIO setup
@@ -19,19 +22,30 @@ for pin in BUTTONS:
 # Server setup
 HOST = ''  # Listen on all interfaces
 PORT = 9090  # Port to communicate with maze.py
+UDP = '--udp' in sys.argv  # Use the maze_udp transport instead of TCP (maze.py needs --udp as well)
 
 running = True
+send_lock = threading.Lock()  # The button and heartbeat threads share the connection
+sent_times = {}  # Sequence number -> time the command was sent, until maze.py has handled it
+
+def send_frame(conn, frame):
+    """Send one maze_protocol frame without interleaving it with another thread's."""
+    with send_lock:
+        conn.sendall(frame)
 
 def listen_for_buttons(conn):
     """Listen for GPIO button presses and send commands to maze.py."""
     global running
     try:
         print("Listening for button presses...")
+        sequence = maze_protocol.Sequence()
         while running:
             for pin, command in BUTTONS.items():
                 if GPIO.input(pin) == GPIO.LOW:  # Button pressed
-                    print(f"Button {pin} pressed, sending '{command}'")
-                    conn.sendall(command.encode())  # Send the command
+                    seq = sequence.next()
+                    print(f"Button {pin} pressed, sending '{command}' ({seq})")
+                    sent_times[seq] = time.perf_counter()
+                    send_frame(conn, maze_protocol.command(seq, command))  # Send the command
                     time.sleep(0.3)  # Debounce delay
     except (ConnectionResetError, BrokenPipeError):
         print("Connection to maze.py lost.")
@@ -47,7 +61,7 @@ def send_heartbeat(conn):
     global running
     try:
         while running:
-            conn.sendall("heartbeat\n".encode())  # Send a heartbeat message
+            send_frame(conn, maze_protocol.heartbeat())  # Send a heartbeat message
             time.sleep(2)  # Wait 2 seconds before sending the next heartbeat
     except (ConnectionResetError, BrokenPipeError):
         print("Connection to maze.py lost during heartbeat.")
@@ -59,8 +73,9 @@ def send_heartbeat(conn):
         print("Heartbeat thread stopped.")
 
 def monitor_connection(conn):
-    """Monitor the connection to maze.py and stop if it's lost."""
+    """Monitor the connection to maze.py, report its acks and results, and stop if it's lost."""
     global running
+    parser = maze_protocol.FrameParser()
     try:
         while running:
             try:
@@ -70,6 +85,12 @@ def monitor_connection(conn):
                     print("Maze.py has closed the connection.")
                     running = False  # Stop the main loop
                     break
+                for frame in parser.feed(data):
+                    if frame.kind == maze_protocol.ACK and frame.seq in sent_times:
+                        print(f"Command {frame.seq} received by maze.py in {(time.perf_counter() - sent_times[frame.seq]) * 1000:.1f} ms")
+                    elif frame.kind == maze_protocol.DONE and frame.seq in sent_times:
+                        status = maze_protocol.STATUS_NAMES.get(maze_protocol.done_status(frame), 'unknown')
+                        print(f"Command {frame.seq} {status} after {(time.perf_counter() - sent_times.pop(frame.seq)) * 1000:.1f} ms")
             except socket.timeout:
                 # No data received within the timeout, assume connection is still alive
                 continue
@@ -77,6 +98,10 @@ def monitor_connection(conn):
                 print("Maze.py connection lost.")
                 running = False
                 break
+            except maze_protocol.ProtocolError as e:
+                print(f"Bad data from maze.py, dropping the connection: {e}")
+                running = False
+                break
     except Exception as e:
         print(f"Error monitoring connection: {e}")
     finally:
@@ -85,28 +110,39 @@ def monitor_connection(conn):
 
 # Controller server setup
 print("Waiting for connection...")
-sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-sock.bind((HOST, PORT))
-sock.listen(1)
+if UDP:
+    sock = maze_udp.DatagramServer(HOST, PORT)
+else:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind((HOST, PORT))
+    sock.listen(1)
+conn = None
 
 try:
-    conn, addr = sock.accept()
-    print(f"Connected by {addr}")
+    while True:  # Serve maze.py again whenever it reconnects
+        conn, addr = sock.accept()
+        print(f"Connected by {addr}")
+        if not UDP:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Send each press at once
+        running = True
+        sent_times.clear()
 
-    # Start a thread to send heartbeats
-    heartbeat_thread = threading.Thread(target=send_heartbeat, args=(conn,), daemon=True)
-    heartbeat_thread.start()
+        # Start a thread to send heartbeats
+        heartbeat_thread = threading.Thread(target=send_heartbeat, args=(conn,), daemon=True)
+        heartbeat_thread.start()
 
-    # Start a thread to monitor the connection
-    monitor_thread = threading.Thread(target=monitor_connection, args=(conn,), daemon=True)
-    monitor_thread.start()
+        # Start a thread to monitor the connection
+        monitor_thread = threading.Thread(target=monitor_connection, args=(conn,), daemon=True)
+        monitor_thread.start()
 
-    # Start listening for button presses
-    listen_for_buttons(conn)
+        # Start listening for button presses
+        listen_for_buttons(conn)
 
-    # Wait for the monitor thread to finish
-    monitor_thread.join()
-    heartbeat_thread.join()  # Wait for the heartbeat thread to finish
+        # Wait for the monitor thread to finish
+        monitor_thread.join()
+        heartbeat_thread.join()  # Wait for the heartbeat thread to finish
+        conn.close()
+        print("Waiting for connection...")
 
 except KeyboardInterrupt:
     print("Exiting server...")
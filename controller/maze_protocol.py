@@ -0,0 +1 @@
+../maze-program/maze_protocol.py
\ No newline at end of file
@@ -0,0 +1 @@
+../maze-program/maze_udp.py
\ No newline at end of file
@@ -1,4 +1,5 @@
 import socket
+import sys
 import RPi.GPIO as GPIO
 import time
 import threading
@@ -8,6 +9,8 @@ import struct
 from picamera2 import Picamera2
 import numpy as np
 import datetime
+import maze_protocol
+import maze_udp
 
 # Motor pins
 in1 = 17
@@ -225,6 +228,7 @@ def detect_line(frame):
 # Server Setup
 HOST = ''  # Listen on all available interfaces
 PORT = 8080  # Port for commands
+UDP = '--udp' in sys.argv  # Use the maze_udp transport instead of TCP (maze.py needs --udp as well)
 # CAMERA_PORT = 7070  # Port for camera stream
 # running = True
 
@@ -295,38 +299,72 @@ try:
 
     # Command server setup
     print("Waiting for connection...")
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.bind((HOST, PORT))
-    sock.listen(1)
-    conn, addr = sock.accept()
-    print(f"Connected by {addr}")
-
-    # Command handling loop
-    try:
-        while True:
-            try:
-                data = conn.recv(1024).decode().strip()
-                if not data:
-                    print("Client disconnected.")
+    if UDP:
+        sock = maze_udp.DatagramServer(HOST, PORT)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind((HOST, PORT))
+        sock.listen(1)
+    while True:  # Serve maze.py again whenever it reconnects
+        conn, addr = sock.accept()
+        print(f"Connected by {addr}")
+        if not UDP:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Send acks and results at once
+
+        # Command handling loop. Commands arrive as maze_protocol frames and may be pipelined: all
+        # received commands are acknowledged at once, then carried out in order, each answered with a
+        # DONE frame. After a failure maze.py rolls its player back, so the commands it sent in the
+        # meantime are skipped until it confirms with "sync".
+        parser = maze_protocol.FrameParser()
+        resyncing = False
+        try:
+            while True:
+                try:
+                    received = conn.recv(1024)
+                    if not received:
+                        print("Client disconnected.")
+                        break
+                    commands = [frame for frame in parser.feed(received) if frame.kind == maze_protocol.COMMAND]
+                    for frame in commands:
+                        conn.sendall(maze_protocol.ack(frame.seq))
+
+                    for frame in commands:
+                        data = maze_protocol.command_name(frame)
+                        print(f"Received command {frame.seq}: {data}")
+
+                        if data == 'sync':
+                            resyncing = False
+                            status = maze_protocol.OK
+                        elif resyncing:
+                            print(f"Skipping {data} until maze.py has rolled back")
+                            status = maze_protocol.SKIPPED
+                        elif data == 'forward':
+                            status = maze_protocol.OK if forward() else maze_protocol.FAILED
+                        elif data == 'left':
+                            turn(-1)  # Turn left 90 degrees
+                            status = maze_protocol.OK
+                        elif data == 'right':
+                            turn(1)   # Turn right 90 degrees
+                            status = maze_protocol.OK
+                        elif data == 'stop':
+                            stop()
+                            status = maze_protocol.OK
+                        else:
+                            print(f"Unknown command: {frame.payload}")
+                            status = maze_protocol.REJECTED
+                        conn.sendall(maze_protocol.done(frame.seq, status))
+                        resyncing = resyncing or status == maze_protocol.FAILED
+                except maze_protocol.ProtocolError as e:
+                    print(f"Bad data from maze.py, closing connection: {e}")
                     break
-
-                print(f"Received command: {data}")
-
-                if data == 'forward':
-                    forward()
-                elif data == 'left':
-                    turn(-1)  # Turn left 90 degrees
-                elif data == 'right':
-                    turn(1)   # Turn right 90 degrees
-                elif data == 'stop':
-                    stop()
-                else:
-                    print(f"Unknown command: {data}")
-            except ConnectionResetError:
-                print("Connection reset by peer. Closing connection.")
-                break
-    except Exception as e:
-        print(f"Unexpected error: {e}")
+                except ConnectionResetError:
+                    print("Connection reset by peer. Closing connection.")
+                    break
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+        stop()  # Don't keep driving without a connection
+        conn.close()
+        print("Waiting for connection...")
 
 
 finally:
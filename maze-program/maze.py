@@ -1,18 +1,58 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QLabel
-from PyQt5.QtGui import QPainter, QPen, QImage, QPixmap, QColor, QFont, QPolygon
-from PyQt5.QtCore import Qt, QPoint, QRect, QTimer
+import time
+START_TIME = time.perf_counter()  # Taken before the other imports, so --startup-time counts them
+
+from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QLabel, QComboBox, QLineEdit
+from PyQt5.QtGui import QPainter, QPen, QImage, QPixmap, QColor, QFont, QFontMetrics, QPolygon, QStaticText, QTransform
+from PyQt5.QtCore import Qt, QPoint, QRect, QLine, QTimer, pyqtSignal
+from collections import OrderedDict
 from enum import Enum
+import os
 import sys
 import random
-import socket
 import threading
-import time
 import difflib
-import speech_recognition as sr
-import multiprocessing
 import struct
-import numpy as np
 # import cv2
+from maze_prefetch import MazePrefetcher
+from maze_link import MazeLink, CONNECTED, tcp_connection
+from maze_input import InputBus, LatencyHistogram
+import maze_protocol
+import maze_udp
+
+# Startup phases and the seconds since START_TIME at which they ended, printed by --startup-time
+STARTUP_PHASES = []
+
+
+def startup_mark(phase):
+    """Note that a startup phase just ended."""
+    STARTUP_PHASES.append((phase, time.perf_counter() - START_TIME))
+
+
+def data_path(name):
+    """Path of a data file kept next to maze.py (or the packaged binary), whatever the working directory."""
+    base = sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__)
+    return os.path.join(os.path.dirname(base), name)
+
+
+startup_mark("imports")
+
+# Fewest pixels per cell at which walls are drawn as lines; below this the overview image is shown instead
+LINE_DETAIL_CELL = 4
+# Fewest pixels per cell at which the start and goal are labelled, and at which the player arrow is full size
+LABEL_CELL = 30
+ARROW_CELL = 60
+# Most cells across the endless maze view, so its chunks stay within the chunk cache
+ENDLESS_VIEW_CELLS = 40
+# Longest side of the minimap in pixels
+MINIMAP_SIZE = 120
+# Maze tiles are TILE_SIZE pixels square; up to TILE_CACHE_SIZE of them are kept
+TILE_SIZE = 256
+TILE_CACHE_SIZE = 64
+# Weight of each measured Maze Navigator command duration in the moving averages the autopilot plans with
+COMMAND_TIME_WEIGHT = 0.2
+# Explored cell overlay colours, as premultiplied 0xAARRGGBB
+TRAIL_COLOR = 0x3C3C2F00
+FOG_COLOR = 0xFF3C3C3C
 
 # Universal directions
 class Dir(Enum):
@@ -21,35 +61,13 @@ class Dir(Enum):
     DOWN = 2
     LEFT = 3
 
-# Maze generation function
-def generate_maze(n, m):
-    """Generates an N x M maze using recursive backtracking."""
-    maze = [[{'visited': False, 'walls': [True, True, True, True]} for _ in range(m)] for _ in range(n)]
-    # directions = [((0, -1), 0), ((0, 1), 1), ((-1, 0), 2), ((1, 0), 3)]  # [Top, Bottom, Left, Right]
-    directions = [((-1, 0), 0), ((0, 1), 1), ((1, 0), 2), ((0, -1), 3)]  # [Top, Right, Bottom, Left]
-
-    def remove_wall(x, y, nx, ny, wall_idx):
-        """Remove walls between (x, y) and (nx, ny)."""
-        maze[x][y]['walls'][wall_idx] = False
-        maze[nx][ny]['walls'][(wall_idx + 2) % 4] = False
-        # print("(" + str(x) + ", " + str(y) + "): connected to (" + str(nx) + ", " + str(ny) + ") in direction " + str(wall_idx))
-
-    def visit_cell(x, y):
-        """Main recursive function for traversing the maze."""
-        maze[x][y]['visited'] = True
-        random.shuffle(directions)  # Shuffle directions for randomness
-        for (dx, dy), wall_idx in directions:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < n and 0 <= ny < m and not maze[nx][ny]['visited']:
-                remove_wall(x, y, nx, ny, wall_idx)
-                visit_cell(nx, ny)
-
-    visit_cell(0, 0)  # Start at the top-left corner
-    return maze
-
 # Main window class
 class MazeWindow(QMainWindow):
-    def __init__(self, n, m):
+    connection_changed = pyqtSignal(str, str)  # Link name, maze_link state
+    command_result = pyqtSignal(object)  # ACK or DONE maze_protocol.Frame from the Maze Navigator
+    maze_ready = pyqtSignal()  # The prefetch thread has queued a maze
+
+    def __init__(self, n, m, udp=False, library_path=None):
         super().__init__()
         self.setWindowTitle("Maze Generator")
         self.setGeometry(100, 100, 800, 900)
@@ -58,36 +76,99 @@ class MazeWindow(QMainWindow):
         QTimer.singleShot(0, self.showMaximized)
         self.n, self.m = n, m  # Maze dimensions
         self.maze_size = 600
-        self.cell_size = min(self.maze_size // n, self.maze_size // m)  # Fit the maze into the window
+        self.cell_size = self.fit_cell_size()  # Zoom, in pixels per cell
+        self.scroll_x = self.scroll_y = 0  # Pixel offset of the view into the maze when it is larger than the view
+        self.drag_start = None  # Mouse position and scroll offsets while the view is dragged
         self.game_started = False
-        self.game_over = True
+
+        # Drawing caches: maze tiles are rebuilt only when the walls or the zoom change
+        self.label_font = QFont("Arial", 16, QFont.Bold)
+        self.label_ascent = QFontMetrics(self.label_font).ascent()
+        self.text_cache = {}  # text -> QStaticText
+        self.tiles = OrderedDict()  # (tile x, tile y) -> QPixmap of that part of the maze, least recently used first
+        self.overview = None  # Overview images of the maze (maze_render.image_pyramid) and their QImages
+        self.minimap = None  # Scaled minimap QPixmap, shown while the maze doesn't fit in the view
+        self.gl_view = None  # OpenGL maze view (maze_gl.MazeGLView) laid over the window, None to draw with QPainter
+
+        # Explored cells, one bool per cell, drawn as a trail or (with fog of war) as the only visible cells
+        self.visited = None
+        self.fog_of_war = False
+        self.game = None  # Game rules and player state, see maze_game.MazeGame
+        self.algorithm = 'backtracking'  # Maze generation algorithm, see maze_grid.GENERATORS
+        self.seed = None  # Seed of the current maze
+        self.difficulty = 'any'  # Target difficulty, see maze_difficulty.DIFFICULTIES
+
+        # The maze engine, the maze library and the prefetcher are set up by start_engine after the first frame
+        self.maze_library = None  # Mazes built from a typed seed, keyed by (n, m, seed, algorithm)
+        self.library_path = library_path or data_path('maze_library.bin')
+        self.prefetcher = None  # Builds the next maze in the background while the current one is played
+        self.waiting_for_maze = False  # New Maze was pressed before the prefetcher had a maze ready
+        self.maze_ready.connect(self.prefetched_maze_ready, Qt.QueuedConnection)
+        self.first_frame_shown = False
+        self.report_startup = False  # Print the startup phases and quit after the first frame (--startup-time)
 
         # Initial maze
         # self.maze = generate_maze(n, m)
 
-        # Initial player position
-        self.player_x, self.player_y = 0, 0
-        self.player_dir = Dir.RIGHT.value
-
-        # Add a cooldown attribute
-        self.last_keypress_time = 0  # Timestamp of the last key press
-        self.keypress_cooldown = 0.3  # Cooldown period in seconds
+        # Maze Navigator command durations in seconds, used by the autopilot planner. They start from
+        # maze_game's estimates (set with the engine) and follow the measured times from sending each
+        # move (or the previous DONE, if the robot was still busy) to its DONE
+        self.forward_time = self.turn_time = None
+        self.measured_commands = 0
+        self.last_done_time = 0.0  # When the Maze Navigator last reported a command done
+        self.autopilot_commands = []
+        self.autopilot_seq = None  # Sequence number of the autopilot command whose DONE starts the next one
+        # Paces the autopilot by the estimated times instead while no Maze Navigator is connected
+        self.autopilot_timer = QTimer(self)
+        self.autopilot_timer.setSingleShot(True)
+        self.autopilot_timer.timeout.connect(self.run_autopilot_step)
+
+        # Shifting maze: walls move while playing, distances are repaired incrementally
+        self.shifter = None
+        self.dstar = None  # D* Lite search, replaces the static hints while shifting
+        self.shift_interval = 3000  # Milliseconds between wall shifts
+        self.shifts_per_tick = 5  # Origin moves per shift, each changes at most two walls
+        self.shift_timer = QTimer(self)
+        self.shift_timer.timeout.connect(self.shift_walls)
+
+        # Endless maze: an unbounded world of generated chunks, shown as an N x M view around the player
+        self.world = None
+        self.view_x = self.view_y = 0  # World cell shown in the top-left corner of the view
+
+        # Player commands from the keyboard, D-pad, Controller and voice, rate limited per source
+        # and handled on the GUI thread (maze_input.py)
+        self.input_bus = InputBus(self.handle_input)
+
+        # Controller and Maze Navigator links use TCP, or with udp=True (--udp) the maze_udp transport,
+        # which the Raspberry Pis then have to be started with as well
+        self.udp = udp
 
         # Controller server details
         self.controller_host = '100.122.70.122'  # Maze Controller Tailscale IP
         self.controller_port = 9090
-        self.controller_client = self.setup_controller_client()
-
-        # Start listening for commands from controller.py
-        if self.controller_client:
-            self.controller_thread = threading.Thread(target=self.listen_to_controller, daemon=True)
-            self.controller_thread.start()
 
         # Socket connection setup for Maze Navigator
         self.server_host = '100.94.211.35' # Maze Navigator Tailscale IP
         self.server_port = 8080
         # self.camera_port = 7070 # UNCOMMENT THIS LINE FOR CAMERA FEED
-        self.socket_client = self.setup_socket_client()
+
+        # Connection status, updated from the link threads through connection_changed
+        self.connection_states = {}  # Link name -> maze_link state
+        self.connection_label = QLabel(self)
+        self.connection_label.setGeometry(50, 15, 600, 25)
+        self.connection_changed.connect(self.show_connection_state, Qt.QueuedConnection)
+
+        # Moves are shown at once and confirmed by the Maze Navigator afterwards. Each sent move keeps
+        # (command, x, y, heading, newly visited cell or None) from before it, to roll back to if it
+        # fails, and the time it was sent
+        self.unconfirmed = OrderedDict()  # Sequence number -> move, oldest first
+        self.command_sequence = maze_protocol.Sequence()
+        self.ack_latency = LatencyHistogram()  # From sending a command to the Maze Navigator's ACK
+        self.command_result.connect(self.reconcile, Qt.QueuedConnection)
+
+        # Both links connect (and reconnect) in the background, so a missing device doesn't hold up the window
+        self.controller_link = self.navigator_link = None
+        self.start_connections()
 
         # Add the regenerate button
         self.regenerate_button = QPushButton("Start", self)
@@ -101,6 +182,65 @@ class MazeWindow(QMainWindow):
         self.restart_button.setGeometry(50, 750, 200, 40)  # Position at bottom-left
         self.restart_button.clicked.connect(self.restart_maze)
 
+        # Add the maze algorithm selector
+        self.algorithm_selector = QComboBox(self)
+        self.algorithm_selector.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.algorithm_selector.setGeometry(300, 750, 200, 40)  # Position at bottom-center
+        self.algorithm_selector.addItem(self.algorithm)  # The other algorithms are added with the engine
+        self.algorithm_selector.currentTextChanged.connect(self.set_algorithm)
+
+        # Add the maze seed input (leave empty for a random maze)
+        self.seed_input = QLineEdit(self)
+        self.seed_input.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.seed_input.setGeometry(50, 800, 200, 40)  # Position at bottom-left
+        self.seed_input.setPlaceholderText("Maze seed (optional)")
+
+        # Add the message line, for input errors and what the maze generation is up to
+        self.message_label = QLabel(self)
+        self.message_label.setGeometry(800, 800, 400, 40)  # Position at bottom-right
+
+        # Add the difficulty selector
+        self.difficulty_selector = QComboBox(self)
+        self.difficulty_selector.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.difficulty_selector.setGeometry(550, 800, 200, 40)  # Position at bottom-right
+        self.difficulty_selector.addItem(self.difficulty)  # The difficulty bands are added with the engine
+        self.difficulty_selector.currentTextChanged.connect(self.set_difficulty)
+
+        # Add the autopilot button
+        self.autopilot_button = QPushButton("Start Autopilot", self)
+        self.autopilot_button.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.autopilot_button.setGeometry(300, 800, 200, 40)  # Position at bottom-center
+        self.autopilot_button.setCheckable(True)
+        self.autopilot_button.clicked.connect(self.toggle_autopilot)
+
+        # Add the shifting maze button
+        self.shifting_button = QPushButton("Start Shifting Maze", self)
+        self.shifting_button.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.shifting_button.setGeometry(300, 850, 200, 40)  # Position at bottom-center
+        self.shifting_button.setCheckable(True)
+        self.shifting_button.clicked.connect(self.toggle_shifting)
+
+        # Add the endless maze button
+        self.endless_button = QPushButton("Endless Maze", self)
+        self.endless_button.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.endless_button.setGeometry(550, 850, 200, 40)  # Position at bottom-right
+        self.endless_button.setCheckable(True)
+        self.endless_button.clicked.connect(self.regenerate_maze)
+
+        # Add the fog of war button
+        self.fog_button = QPushButton("Fog of War", self)
+        self.fog_button.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.fog_button.setGeometry(50, 850, 200, 40)  # Position at bottom-left
+        self.fog_button.setCheckable(True)
+        self.fog_button.clicked.connect(self.toggle_fog_of_war)
+
+        # Add the OpenGL renderer button
+        self.opengl_button = QPushButton("OpenGL Renderer", self)
+        self.opengl_button.setStyleSheet("background-color: #FFFAF5; color: black")
+        self.opengl_button.setGeometry(800, 850, 200, 40)  # Position at bottom-right
+        self.opengl_button.setCheckable(True)
+        self.opengl_button.clicked.connect(self.toggle_opengl)
+
         # Add Camera Feed Label
         # self.camera_feed_label = QLabel("Camera Feed", self)
         # self.camera_feed_label.setGeometry(775, 75, 640, 20)  # Positioned above the camera feed
@@ -119,9 +259,8 @@ class MazeWindow(QMainWindow):
         # self.camera_thread = threading.Thread(target=self.receive_camera_data, daemon=True)
         # self.camera_thread.start()
 
-        # Add voice command listener
-        self.voice_thread = threading.Thread(target=self.listen, daemon=True)
-        self.voice_thread.start()
+        # Voice command listener, started the first time voice commands are enabled
+        self.voice_thread = None
 
         # Voice command toggle
         self.is_listening = False
@@ -133,60 +272,138 @@ class MazeWindow(QMainWindow):
         self.voice_toggle_button.setCheckable(True)
         self.voice_toggle_button.clicked.connect(self.toggle_voice_commands)
 
-    def setup_controller_client(self):
-        """Set up a client socket to connect to 'controller.py'."""
-        try:
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.settimeout(5.0)  # Timeout after 5 seconds
-            client_socket.connect((self.controller_host, self.controller_port))
-            print(f"Connected to Controller at {self.controller_host}:{self.controller_port}")
-            return client_socket
-        except socket.timeout:
-            print("Controller connection timed out.")
-            return None
-        except Exception as e:
-            print(f"Failed to connect to Controller: {e}")
-            return None
-        
-    def listen_to_controller(self):
-        """Continuously listen for commands from 'controller.py'."""
-        try:
-            while True:
-                data = self.controller_client.recv(1024).decode().strip()
-                if not data:
-                    break  # Connection closed
-                if data == "heartbeat":
-                    continue  # Ignore heartbeat messages
-                print(f"Received command from Controller: {data}")
-
-                # Map commands to actions
-                if data == 'w':
-                    self.movePlayer()
-                elif data == 'a':
-                    self.rotatePlayer(0)
-                elif data == 'd':
-                    self.rotatePlayer(1)
-                else:
-                    print(f"Unknown command: {data}")
-        except Exception as e:
-            print(f"Error receiving data from Controller: {e}")
-        finally:
-            self.controller_client.close()
-
-    def setup_socket_client(self):
-        """Set up the socket client for communication with the Maze Navigator"""
-        try:
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.settimeout(5.0)  # Timeout after 5 seconds
-            client_socket.connect((self.server_host, self.server_port))
-            print(f"Connected to Maze Navigator at {self.server_host}:{self.server_port}")
-            return client_socket
-        except socket.timeout:
-            print("Maze Navigator connection timed out.")
-            return None
-        except Exception as e:
-            print(f"Failed to connect to Maze Navigator: {e}")
-            return None
+    def start_connections(self):
+        """Start the links to controller.py and the Maze Navigator."""
+        connect = maze_udp.create_connection if self.udp else tcp_connection
+        self.controller_link = MazeLink("Controller", self.controller_host, self.controller_port,
+                                        on_state=self.connection_changed.emit, on_data=self.handle_controller_frame,
+                                        new_parser=maze_protocol.FrameParser, connect=connect,
+                                        read_timeout=6.0)  # Three missed heartbeats
+        self.navigator_link = MazeLink("Maze Navigator", self.server_host, self.server_port,
+                                       on_state=self.connection_changed.emit, on_data=self.handle_navigator_frame,
+                                       new_parser=maze_protocol.FrameParser, connect=connect)
+        self.controller_link.start()
+        self.navigator_link.start()
+
+    def show_connection_state(self, name, state):
+        """Show a link's state under the window title."""
+        self.connection_states[name] = state
+        self.connection_label.setText("   ".join(f"{name}: {state}" for name, state in self.connection_states.items()))
+        if self.navigator_link is not None and name == self.navigator_link.name and state != CONNECTED:
+            self.forget_unconfirmed()  # Their results went with the connection
+
+    def handle_navigator_frame(self, frame):
+        """Pass the Maze Navigator's acks and results on to the GUI thread. Runs on the link thread."""
+        if frame.kind in (maze_protocol.ACK, maze_protocol.DONE):
+            self.command_result.emit(frame)
+
+    def reconcile(self, frame):
+        """Confirm an unconfirmed move, or roll back to before it if the Maze Navigator failed it.
+
+        After a failure the navigator skips everything until it receives "sync", so the moves sent
+        after the failed one are rolled back with it, and the player is again where the robot is.
+        """
+        move = self.unconfirmed.get(frame.seq)
+        if frame.kind == maze_protocol.ACK:
+            if move is not None:
+                self.ack_latency.add(time.perf_counter() - move[-1])
+            return
+        if move is not None:
+            del self.unconfirmed[frame.seq]
+        status = maze_protocol.done_status(frame)
+        now = time.perf_counter()
+        if move is not None and status == maze_protocol.OK:
+            self.measure_command(move[0], now - max(move[-1], self.last_done_time))
+        self.last_done_time = now
+        if frame.seq == self.autopilot_seq:
+            self.autopilot_seq = None
+            if status == maze_protocol.OK:
+                self.run_autopilot_step()
+            else:
+                self.stop_autopilot()
+        if status != maze_protocol.FAILED:
+            return
+
+        # A failed move from before a restart has no entry, but the moves sent since are still skipped
+        moves = ([move] if move is not None else []) + list(self.unconfirmed.values())
+        self.unconfirmed.clear()
+        self.send_command_to_rpi("sync")
+        print(f"Maze Navigator could not carry out command {frame.seq}, undoing {len(moves)} move(s)")
+        if not moves:
+            return
+        self.stop_autopilot()  # Its plan started from where the robot isn't
+        for _, _, _, _, cell, _ in moves:
+            if cell is not None:
+                self.visited[cell] = False
+        _, self.game.x, self.game.y, self.game.heading, _, _ = moves[0]
+        if self.visited is not None and self.gl_view is not None:
+            self.gl_view.reload()
+        self.update_hints()
+        self.follow_player()
+        self.update()
+
+    def measure_command(self, command, seconds):
+        """Fold the measured duration of a completed move into the autopilot's command times."""
+        if command == "forward":
+            self.forward_time += COMMAND_TIME_WEIGHT * (seconds - self.forward_time)
+        else:
+            self.turn_time += COMMAND_TIME_WEIGHT * (seconds - self.turn_time)
+        self.measured_commands += 1
+
+    def discard_unconfirmed(self):
+        """Start a new game without waiting for the moves of the old one; their results are ignored."""
+        self.unconfirmed.clear()
+
+    def forget_unconfirmed(self):
+        """Stop waiting for results of the moves sent so far; the player stays where it is."""
+        if self.unconfirmed:
+            print(f"{len(self.unconfirmed)} move(s) were not confirmed by the Maze Navigator")
+        self.unconfirmed.clear()
+        if self.autopilot_seq is not None:
+            print("Autopilot stopped, the Maze Navigator link was lost")
+            self.stop_autopilot()
+
+    def handle_controller_frame(self, frame):
+        """Acknowledge commands from 'controller.py' and queue them. Runs on the Controller link thread."""
+        if frame.kind != maze_protocol.COMMAND:
+            return  # Heartbeats only keep the link alive
+        self.controller_link.send(maze_protocol.ack(frame.seq))
+        command = maze_protocol.command_name(frame)
+        print(f"Received command {frame.seq} from Controller: {command}")
+        if command in ('forward', 'left', 'right'):
+            self.input_bus.post('controller', command, done=lambda handled, seq=frame.seq: self.controller_link.send(
+                maze_protocol.done(seq, maze_protocol.OK if handled else maze_protocol.SKIPPED)))
+        else:
+            print(f"Unknown command: {frame.payload}")
+            self.controller_link.send(maze_protocol.done(frame.seq, maze_protocol.REJECTED))
+
+    def handle_input(self, event):
+        """Carry out a player command from the input bus, on the GUI thread."""
+        if event.command == 'forward':
+            self.movePlayer()
+        elif event.command == 'left':
+            self.rotatePlayer(0)
+        elif event.command == 'right':
+            self.rotatePlayer(1)
+
+    def closeEvent(self, event):
+        """Close the links and print their connection metrics and the input latencies."""
+        for link in (self.controller_link, self.navigator_link):
+            if link is not None:
+                link.close()
+                metrics = link.metrics()
+                if metrics['time_to_connect'] is not None:
+                    print(f"{link.name}: connected in {metrics['time_to_connect']:.2f}s, {metrics['drops']} drops"
+                          + (f", recovered in {metrics['mean_recovery']:.2f}s on average ({metrics['max_recovery']:.2f}s at most)"
+                             if metrics['recoveries'] else ""))
+        for line in self.input_bus.report():
+            print(f"Input latency, {line}")
+        if self.ack_latency.total:
+            print(f"Maze Navigator ack round trip: {self.ack_latency.summary()}")
+        if self.measured_commands:
+            print(f"Maze Navigator command times from {self.measured_commands} moves: "
+                  f"forward {self.forward_time:.2f}s, turn {self.turn_time:.2f}s")
+        super().closeEvent(event)
 
     def setup_dpad(self):
         """Set up D-Pad buttons for on-screen control"""
@@ -199,17 +416,17 @@ class MazeWindow(QMainWindow):
         self.left_button = QPushButton("↺", self)
         self.left_button.setStyleSheet("background-color: #FFFAF5; color: black")
         self.left_button.setGeometry(dpad_center_x - int(1.5 * dpad_button_width) - dpad_button_margin, dpad_center_y - int(0.5 * dpad_button_height), dpad_button_width, dpad_button_height)
-        self.left_button.clicked.connect(lambda: self.rotatePlayer(0))
+        self.left_button.clicked.connect(lambda: self.input_bus.post('dpad', 'left'))
 
         self.up_button = QPushButton("↑", self)
         self.up_button.setStyleSheet("background-color: #FFFAF5; color: black")
         self.up_button.setGeometry(dpad_center_x - int(0.5 * dpad_button_width), dpad_center_y - int(1.5 * dpad_button_height) - dpad_button_margin, dpad_button_width, dpad_button_height)
-        self.up_button.clicked.connect(lambda: self.movePlayer())
+        self.up_button.clicked.connect(lambda: self.input_bus.post('dpad', 'forward'))
 
         self.right_button = QPushButton("↻", self)
         self.right_button.setStyleSheet("background-color: #FFFAF5; color: black")
         self.right_button.setGeometry(dpad_center_x + int(0.5 * dpad_button_width) + dpad_button_margin, dpad_center_y - int(0.5 * dpad_button_height), dpad_button_width, dpad_button_height)
-        self.right_button.clicked.connect(lambda: self.rotatePlayer(1))
+        self.right_button.clicked.connect(lambda: self.input_bus.post('dpad', 'right'))
 
         """self.down_button = QPushButton("↓", self)
         self.down_button.setGeometry(dpad_center_x - int(0.5 * dpad_button_width), dpad_center_y + int(0.5 * dpad_button_height + dpad_button_margin), dpad_button_width, dpad_button_height)
@@ -283,15 +500,17 @@ class MazeWindow(QMainWindow):
     #                 pass
     
     def send_command_to_rpi(self, command):
-        """Send command to the Maze Navigator."""
-        if self.socket_client:
-            try:
-                self.socket_client.sendall(f"{command}\n".encode())
-                print(f"Send command: {command}")
-            except Exception as e:
-                print(f"Failed to send command: {e}")
+        """Send command to the Maze Navigator. Returns its sequence number, or None if it wasn't sent."""
+        seq = self.command_sequence.next()
+        if self.navigator_link and self.navigator_link.send(maze_protocol.command(seq, command)):
+            self.input_bus.robot_sent()
+            print(f"Send command {seq}: {command}")
+            return seq
+        return None
 
     def listen(self):
+        import speech_recognition as sr  # Only loaded once voice commands are used
+
         r = sr.Recognizer()
         m = sr.Microphone()
 
@@ -322,13 +541,7 @@ class MazeWindow(QMainWindow):
                         if closest_match:
                             matched_command = closest_match[0]
                             print(f"Matched command: {matched_command}")
-
-                            if matched_command == "forward":
-                                self.movePlayer()
-                            elif matched_command == "left":
-                                self.rotatePlayer(0)
-                            elif matched_command == "right":
-                                self.rotatePlayer(1)
+                            self.input_bus.post('voice', matched_command)
                         else:
                             print(f"No valid command recognized")
                 except sr.UnknownValueError:
@@ -343,192 +556,833 @@ class MazeWindow(QMainWindow):
         if self.voice_toggle_button.isChecked():
             self.is_listening = True
             self.voice_toggle_button.setText("Disable Voice Commands")
+            if self.voice_thread is None:
+                # Open the microphone and calibrate it only now, it takes a while
+                self.voice_thread = threading.Thread(target=self.listen, daemon=True)
+                self.voice_thread.start()
             print("Voice commands enabled")
         else:
             self.is_listening = False
             self.voice_toggle_button.setText("Enable Voice Commands")
             print("Voice commands disabled")
 
+    def toggle_autopilot(self):
+        """Start or stop driving the Maze Navigator along the fastest planned route."""
+        from maze_graph import CorridorGraph
+        if self.autopilot_button.isChecked() and self.world is not None:
+            print("Autopilot needs a goal, it is not available in the endless maze")
+            self.stop_autopilot()
+        elif self.autopilot_button.isChecked() and self.game_started and not self.game_over:
+            if self.dstar is not None:
+                # Walls keep moving, so steer one command at a time along the repaired path
+                self.autopilot_button.setText("Stop Autopilot")
+                self.run_autopilot_step()
+                return
+            if self.corridors is None:
+                self.corridors = CorridorGraph(self.maze, keep=[(self.n - 1, self.m - 1)])
+            plan = self.corridors.plan((self.player_y, self.player_x), self.player_dir,
+                                       (self.n - 1, self.m - 1), self.forward_time, self.turn_time)
+            if plan is None:
+                print("Autopilot found no route to the goal")
+                self.stop_autopilot()
+                return
+            self.autopilot_commands, total_time = plan
+            print(f"Autopilot: {len(self.autopilot_commands)} commands, estimated {total_time:.1f}s")
+            self.autopilot_button.setText("Stop Autopilot")
+            self.run_autopilot_step()
+        else:
+            self.stop_autopilot()
+
+    def run_autopilot_step(self):
+        """Send the next autopilot command; the next step runs when the robot reports it done."""
+        if self.dstar is not None and not self.game_over:
+            self.autopilot_commands = self.next_dstar_commands()
+        if not self.autopilot_commands or self.game_over:
+            self.stop_autopilot()
+            return
+
+        command = self.autopilot_commands.pop(0)
+        if command == "forward":
+            seq, estimate = self.movePlayer(), self.forward_time
+        else:
+            seq, estimate = self.rotatePlayer(0 if command == "left" else 1), self.turn_time
+        if seq is not None:
+            self.autopilot_seq = seq  # See reconcile
+        else:
+            self.autopilot_timer.start(int(estimate * 1000))
+
+    def next_dstar_commands(self):
+        """Commands for the next step along the D* Lite path: a forward move or one turn towards it."""
+        heading = self.dstar.next_heading()
+        if heading is None:
+            print("Autopilot found no route to the goal")
+            return []
+        delta = (heading - self.player_dir) % 4
+        if delta == 0:
+            return ["forward"]
+        return ["left"] if delta == 3 else ["right"]
+
+    def stop_autopilot(self):
+        """Stop the autopilot and drop any remaining commands."""
+        self.autopilot_timer.stop()
+        self.autopilot_commands = []
+        self.autopilot_seq = None
+        self.autopilot_button.setChecked(False)
+        self.autopilot_button.setText("Start Autopilot")
+
+    def toggle_shifting(self):
+        """Start or stop shifting the maze walls while playing."""
+        if self.shifting_button.isChecked():
+            self.shifting_button.setText("Stop Shifting Maze")
+            if self.game_started and self.world is None:
+                self.start_shifting()
+        else:
+            self.shifting_button.setText("Start Shifting Maze")
+            self.stop_shifting()
+
+    def start_shifting(self):
+        """Set up the wall shifter and the incremental search for the current maze."""
+        from maze_dynamic import MazeShifter, DStarLite
+        self.shifter = MazeShifter(self.maze, random.Random(self.seed))
+        self.dstar = DStarLite(self.maze, (self.player_y, self.player_x), (self.n - 1, self.m - 1))
+        self.cells_remaining = None
+        self.update_hints()
+        self.shift_timer.start(self.shift_interval)
+        print("Shifting maze started")
+
+    def stop_shifting(self):
+        """Freeze the walls and go back to the precomputed hints."""
+        from maze_solver import MazeHints
+        self.shift_timer.stop()
+        if self.dstar is None:
+            return
+        self.shifter = self.dstar = None
+        self.hints = MazeHints(self.maze, (0, 0), (self.n - 1, self.m - 1))
+        if self.game is not None:
+            self.update_hints()
+        self.update()
+        print("Shifting maze stopped")
+
+    def shift_walls(self):
+        """Move some walls and repair the distances to the goal."""
+        if self.game_over:
+            return
+        changed = self.shifter.shift(self.shifts_per_tick)
+        self.dstar.update_walls(changed)
+        self.corridors = None  # The corridor graph no longer matches the walls
+        self.tiles.clear()
+        if self.gl_view is not None:
+            self.gl_view.update_walls(changed)
+        self.overview = self.minimap = None
+        self.cells_remaining = self.dstar.distance()
+        self.update()
+
+    def start_engine(self):
+        """Load the maze engine, fill in the selectors and start prefetching the first maze. Runs once.
+
+        The engine is built on numpy, the slowest import of the program, and the start screen needs
+        none of it, so this runs once the first frame is up. The methods that use the engine import
+        their parts themselves, which only looks them up once they are loaded.
+        """
+        if self.maze_library is not None:
+            return
+        from maze_grid import GENERATORS
+        from maze_library import MazeLibrary
+        from maze_difficulty import DIFFICULTIES
+        from maze_game import FORWARD_TIME, TURN_TIME
+        self.maze_library = MazeLibrary(self.library_path)
+        self.prefetcher = MazePrefetcher(self.build_maze, (self.n, self.m, self.algorithm, self.difficulty),
+                                         on_ready=self.maze_ready.emit)
+        self.forward_time = FORWARD_TIME
+        self.turn_time = TURN_TIME
+        for selector, items in ((self.algorithm_selector, GENERATORS.keys()), (self.difficulty_selector, ['any', *DIFFICULTIES.keys()])):
+            current = selector.currentText()
+            selector.blockSignals(True)  # The selection stays the same
+            selector.clear()
+            selector.addItems(items)
+            selector.setCurrentText(current)
+            selector.blockSignals(False)
+
+    def after_first_frame(self):
+        """Finish starting up once the start screen is showing."""
+        startup_mark("first frame")
+        self.start_engine()
+        startup_mark("maze engine")
+        if self.report_startup:
+            print("Startup: " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in STARTUP_PHASES))
+            QApplication.quit()
+
+    def set_algorithm(self, algorithm):
+        """Select the algorithm used for the next generated maze."""
+        self.algorithm = algorithm
+        self.prefetcher.set_key((self.n, self.m, self.algorithm, self.difficulty))
+        print(f"Maze algorithm set to: {algorithm}")
+
+    def set_difficulty(self, difficulty):
+        """Select the target difficulty for the next generated maze."""
+        self.difficulty = difficulty
+        self.prefetcher.set_key((self.n, self.m, self.algorithm, self.difficulty))
+        print(f"Maze difficulty set to: {difficulty}")
+
+    def build_maze(self, n, m, algorithm, difficulty, seed=None):
+        """Build a maze and its hints, keeping it in the library if it was asked for by seed.
+
+        Returns (maze, hints, message), where message tells the player the difficulty wasn't reached
+        (None if it was). Runs on the prefetch thread for random mazes, so it must not touch Qt.
+        """
+        from maze_grid import generate_maze
+        from maze_solver import MazeHints
+        from maze_difficulty import find_seed
+        message = None
+        if seed is None:
+            seed = random.randrange(2**32)
+            if difficulty != 'any':
+                found = find_seed(n, m, difficulty, algorithm, first_seed=seed)
+                if found:
+                    seed, metrics = found
+                    print(f"Found {difficulty} maze: {metrics}")
+                else:
+                    print(f"No {difficulty} {algorithm} maze found, using seed {seed}")
+                    message = f"No {difficulty} {n}x{m} maze found, playing a random one"
+            grid = generate_maze(n, m, algorithm, seed=seed)  # Random mazes aren't worth keeping in the library
+        else:
+            grid = self.maze_library.load_or_generate(n, m, seed, algorithm)
+        if grid.generation_time is None:
+            print(f"Loaded {n}x{m} {algorithm} maze with seed {seed} from library")
+        else:
+            print(f"Generated {n}x{m} {algorithm} maze with seed {seed} in {grid.generation_time:.3f}s")
+        return grid, MazeHints(grid, (0, 0), (n - 1, m - 1)), message
+
     def regenerate_maze(self):
         """Regenerate the maze and refresh the display."""
+        self.start_engine()  # In case the first frame hasn't been shown yet
+        try:
+            seed = self.parse_seed()
+        except ValueError as e:
+            self.message_label.setText(str(e))
+            return
+        self.message_label.clear()
+        self.waiting_for_maze = False
+        self.stop_autopilot()
+        self.stop_shifting()
+        if self.endless_button.isChecked():
+            self.game_started = True
+            self.start_endless(seed)
+            return
+        key = (self.n, self.m, self.algorithm, self.difficulty)
+        if seed is not None:
+            self.start_maze(*self.build_maze(*key, seed=seed))
+            return
+        # Swap in the prefetched maze if it is ready, otherwise keep the window responsive until it is
+        result = self.prefetcher.take(key)
+        if result is None:
+            self.waiting_for_maze = True
+            self.message_label.setText("Generating…")
+            return
+        self.start_maze(*result)
+
+    def prefetched_maze_ready(self):
+        """Start the maze the player is waiting for, once the prefetch thread has built it."""
+        if not self.waiting_for_maze:
+            return
+        result = self.prefetcher.take((self.n, self.m, self.algorithm, self.difficulty))
+        if result is not None:
+            self.waiting_for_maze = False
+            self.message_label.clear()
+            self.start_maze(*result)
+
+    def start_maze(self, maze, hints, message=None):
+        """Start a game on a newly built maze and refresh the display, showing message if there is one."""
+        import numpy as np
+        from maze_game import MazeGame
+        if message:
+            self.message_label.setText(message)
         self.game_started = True
-        self.maze = generate_maze(self.n, self.m)
-        self.player_x, self.player_y = 0, 0
-        self.player_dir = Dir.RIGHT.value
-        self.game_over = False
+        self.world = None
+        self.view_x = self.view_y = 0
+        self.cell_size = self.fit_cell_size()
+        self.scroll_x = self.scroll_y = 0
+        self.maze, self.hints = maze, hints
+        self.seed = self.maze.seed
+        self.discard_unconfirmed()
+        self.game = MazeGame(self.maze, (0, 0), Dir.RIGHT.value)
+        self.visited = np.zeros((self.n, self.m), dtype=bool)
+        self.visited[self.player_y, self.player_x] = True
+        self.corridors = None  # Corridor graph for the autopilot, built on first use
+        self.tiles.clear()
+        self.overview = self.minimap = None
+        self.update_hints()
+        if self.shifting_button.isChecked():
+            self.start_shifting()
+        self.regenerate_button.setText("New Maze")
+        self.update()  # Refresh the GUI
+
+    def parse_seed(self):
+        """Seed typed in the seed input, or None if it is empty. Raises ValueError if it isn't a valid seed."""
+        from maze_library import MAX_SEED
+        seed_text = self.seed_input.text().strip()
+        if not seed_text:
+            return None
+        try:
+            seed = int(seed_text)
+        except ValueError:
+            raise ValueError(f"Seed must be a whole number, not {seed_text!r}") from None
+        if not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"Seed must be between 0 and {MAX_SEED}")
+        return seed
+
+    def start_endless(self, seed=None):
+        """Start a new endless maze from the typed world seed (see parse_seed), or a random one if None."""
+        from maze_endless import ChunkedMaze, EndlessGame
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.world = ChunkedMaze(self.seed, algorithm=self.algorithm)
+        self.visited = None  # The endless maze has no fixed cells to keep a bitset for
+        self.overview = self.minimap = None
+        self.cell_size = max(self.fit_cell_size(), self.maze_size // ENDLESS_VIEW_CELLS)
+        self.scroll_x = self.scroll_y = 0
+        self.discard_unconfirmed()
+        self.game = EndlessGame(self.world, (0, 0), Dir.RIGHT.value)
+        self.corridors = None
+        self.update_view()
         self.regenerate_button.setText("New Maze")
+        print(f"Started endless {self.algorithm} maze with world seed {self.seed}")
         self.update()  # Refresh the GUI
 
+    def update_view(self):
+        """Recentre the endless maze view on the player."""
+        cells = -(-self.maze_size // self.cell_size)  # Cells needed to fill the view
+        self.view_x = self.player_x - cells // 2
+        self.view_y = self.player_y - cells // 2
+        self.maze = self.world.view(self.view_y, self.view_x, cells, cells)
+        self.tiles.clear()
+
+    def fit_cell_size(self):
+        """Largest zoom that fits the whole maze in the view, at least one pixel per cell."""
+        return max(1, min(self.maze_size // self.n, self.maze_size // self.m))
+
+    def origin(self):
+        """Window position of the top-left corner of cell (0, 0) of self.maze."""
+        return 50 - self.scroll_x, 50 - self.scroll_y
+
+    def visible_cells(self, rect):
+        """Row and column ranges (top, bottom, left, right) of the cells of self.maze inside rect and the view."""
+        rect = rect.intersected(QRect(50, 50, self.maze_size, self.maze_size))
+        size = self.cell_size
+        origin_x, origin_y = self.origin()
+        top, bottom = max(0, (rect.top() - origin_y) // size), min(self.maze.n, (rect.bottom() - origin_y) // size + 1)
+        left, right = max(0, (rect.left() - origin_x) // size), min(self.maze.m, (rect.right() - origin_x) // size + 1)
+        return top, max(top, bottom), left, max(left, right)
+
+    def scroll_to(self, scroll_x, scroll_y):
+        """Move the view, keeping it inside the maze. Returns True if it moved."""
+        scroll_x = min(max(0, scroll_x), max(0, self.m * self.cell_size - self.maze_size))
+        scroll_y = min(max(0, scroll_y), max(0, self.n * self.cell_size - self.maze_size))
+        if self.world is not None or (scroll_x, scroll_y) == (self.scroll_x, self.scroll_y):
+            return False  # The endless view always follows the player
+        self.scroll_x, self.scroll_y = scroll_x, scroll_y
+        self.update()
+        return True
+
+    def center_on(self, x, y):
+        """Scroll the view so cell (x, y) (column, row) is in the middle."""
+        size = self.cell_size
+        return self.scroll_to(int((x + 0.5) * size) - self.maze_size // 2, int((y + 0.5) * size) - self.maze_size // 2)
+
+    def follow_player(self):
+        """Recentre the view if the player's cell is not fully visible. Returns True if it moved."""
+        if self.world is not None:
+            return False
+        size = self.cell_size
+        left, top = self.player_x * size - self.scroll_x, self.player_y * size - self.scroll_y
+        if 0 <= left and left + size <= self.maze_size and 0 <= top and top + size <= self.maze_size:
+            return False
+        return self.center_on(self.player_x, self.player_y)
+
+    def set_zoom(self, cell_size, anchor=None):
+        """Zoom to cell_size pixels per cell, keeping the maze point under anchor (default: view centre) in place."""
+        low = self.maze_size // ENDLESS_VIEW_CELLS if self.world is not None else 1
+        cell_size = min(max(low, cell_size), self.maze_size // 2)
+        if cell_size == self.cell_size:
+            return
+        if anchor is None:
+            anchor = QPoint(50 + self.maze_size // 2, 50 + self.maze_size // 2)
+        world_x = (anchor.x() - 50 + self.scroll_x) / self.cell_size
+        world_y = (anchor.y() - 50 + self.scroll_y) / self.cell_size
+        self.cell_size = cell_size
+        self.tiles.clear()
+        if self.world is not None:
+            self.update_view()
+        else:
+            self.scroll_to(int(world_x * cell_size) - (anchor.x() - 50), int(world_y * cell_size) - (anchor.y() - 50))
+        self.update()
+
+    def minimap_rect(self):
+        """Window area of the minimap, or None while the whole maze fits in the view."""
+        if self.world is not None or not self.game_started:
+            return None
+        if self.m * self.cell_size <= self.maze_size and self.n * self.cell_size <= self.maze_size:
+            return None
+        scale = MINIMAP_SIZE / max(self.n, self.m)
+        return QRect(self.maze_size + 70, 50, max(1, int(self.m * scale)), max(1, int(self.n * scale)))
+
     def restart_maze(self):
         """Reset player position and refresh the display."""
-        self.player_x, self.player_y = 0, 0
-        self.player_dir = Dir.RIGHT.value
-        self.game_over = False
+        self.stop_autopilot()
+        if self.game is None:
+            return
+        self.discard_unconfirmed()
+        self.game.reset()
+        if self.visited is not None:
+            self.visited[:] = False
+            self.visited[self.player_y, self.player_x] = True
+            if self.gl_view is not None:
+                self.gl_view.reload()
+        self.update_hints()
         self.update()  # Refresh the GUI
 
+    def update_hints(self):
+        """Look up the hints for the player's cell in the precomputed distance field."""
+        if self.world is not None:
+            self.update_view()  # No goal to give hints for, keep the player in view instead
+            return
+        if self.dstar is not None:
+            # Shifting maze: repair the path from the player's new cell instead
+            remaining = self.cells_remaining
+            self.dstar.move_start((self.player_y, self.player_x))
+            self.cells_remaining = self.dstar.distance()
+            self.on_optimal_path = remaining is None or self.cells_remaining is None or self.cells_remaining < remaining
+            return
+        self.cells_remaining = self.hints.cells_remaining(self.player_y, self.player_x)
+        self.on_optimal_path = self.hints.is_on_optimal_path(self.player_y, self.player_x)
+
+    # Player state lives in the game engine; the window only reads it
+    @property
+    def player_x(self):
+        return self.game.x
+
+    @property
+    def player_y(self):
+        return self.game.y
+
+    @property
+    def player_dir(self):
+        return self.game.heading
+
+    @property
+    def game_over(self):
+        return self.game is None or self.game.is_won()
+
+    def toggle_fog_of_war(self):
+        """Switch between showing the explored cells as a trail and hiding everything unexplored."""
+        self.fog_of_war = self.fog_button.isChecked()
+        self.update()
+
+    def toggle_opengl(self):
+        """Switch the maze view between the OpenGL renderer and the QPainter tiles."""
+        from maze_gl import MazeGLView, opengl_available
+        if self.opengl_button.isChecked():
+            if not opengl_available():
+                print("OpenGL 2.0 is not available, keeping the QPainter renderer")
+                self.opengl_button.setChecked(False)
+                return
+            self.gl_view = MazeGLView(self, LINE_DETAIL_CELL)
+            self.gl_view.failed.connect(self.opengl_failed, Qt.QueuedConnection)
+            self.gl_view.place()
+            self.gl_view.show()
+            print("Drawing the maze with OpenGL")
+        elif self.gl_view is not None:
+            self.gl_view.deleteLater()
+            self.gl_view = None
+            print("Drawing the maze with QPainter")
+        self.update()
+
+    def opengl_failed(self, reason):
+        """Go back to the QPainter renderer when the OpenGL view can't draw the maze."""
+        print(f"{reason}, switching to the QPainter renderer")
+        self.opengl_button.setChecked(False)
+        self.toggle_opengl()
+
+    def update(self, *args):
+        """Schedule a repaint. The OpenGL view has a surface of its own, so it is repainted along with the window."""
+        super().update(*args)
+        if self.gl_view is not None:
+            self.gl_view.update()
+
+    def arrow_scale(self):
+        """Size of the player arrow relative to full size, smaller when zoomed out."""
+        return min(1.0, max(0.3, self.cell_size / ARROW_CELL))
+
+    def player_rect(self):
+        """Window area covered by the player's cell and arrow."""
+        origin_x, origin_y = self.origin()
+        center = QPoint(origin_x + int(self.cell_size * (self.player_x - self.view_x + 0.5)), origin_y + int(self.cell_size * (self.player_y - self.view_y + 0.5)))
+        half = max(self.cell_size // 2, int(27 * self.arrow_scale()) + 1)  # The arrow reaches 25px from the centre, plus the pen
+        return QRect(center.x() - half, center.y() - half, 2 * half + 1, 2 * half + 1)
+
     def movePlayer(self):
-        """Update player position by moving forward"""
+        """Update player position by moving forward. Returns the sequence number of the command sent to the robot, if any."""
+        seq = None
         if not self.game_over:
-            px, py = self.player_x, self.player_y
-            pcell = self.maze[py][px]
-
-            direction = self.player_dir
-
-            match direction:
-                case Dir.UP.value:      # 0
-                    if not pcell['walls'][0]:
-                        self.send_command_to_rpi("forward")
-                        self.player_y -= 1
-                case Dir.RIGHT.value:   # 1 
-                    if not pcell['walls'][1]:
-                        self.send_command_to_rpi("forward")
-                        self.player_x += 1
-                case Dir.DOWN.value:    # 2
-                    if not pcell['walls'][2]:
-                        self.send_command_to_rpi("forward")
-                        self.player_y += 1
-                case Dir.LEFT.value:    # 3
-                    if not pcell['walls'][3]:
-                        self.send_command_to_rpi("forward")
-                        self.player_x -= 1
-                case _:
-                    print("Car is facing an invalid direction")
-
-            if self.player_x is (self.m - 1) and self.player_y is (self.n - 1):
-                self.game_over = True
-
-            self.update()
+            old_rect = self.player_rect()
+            before = (self.game.x, self.game.y, self.game.heading)
+            if self.game.move():
+                cell = (self.player_y, self.player_x)
+                newly_visited = self.visited is not None and not self.visited[cell]
+                seq = self.send_command_to_rpi("forward")
+                if seq is not None:
+                    self.unconfirmed[seq] = ("forward", *before, cell if newly_visited else None, time.perf_counter())
+                if self.visited is not None:
+                    self.visited[cell] = True
+                    if self.gl_view is not None:
+                        self.gl_view.visit(self.player_y, self.player_x)
+                self.update_hints()
+                if self.world is not None or self.game_over or self.follow_player():
+                    self.update()  # The view moved, or the win message covers the maze
+                    return seq
+                self.update(old_rect)
+                self.update(QRect(50, 50 + self.maze_size, self.width() - 50, 40))  # Hint line
+                minimap = self.minimap_rect()
+                if minimap is not None:
+                    self.update(minimap.adjusted(-3, -3, 3, 3))  # Player dot
+            self.update(self.player_rect())
+        return seq
 
     def rotatePlayer(self, direction):
         """Update player status by rotating left or right"""
-        """0 = Rotate Left, 1 = Rotate Right"""
+        """0 = Rotate Left, 1 = Rotate Right. Returns the sequence number of the command sent to the robot, if any."""
+        seq = None
         if not self.game_over:
-            if direction == 0:      # Rotate left
-                self.send_command_to_rpi("left")
-                self.player_dir = (self.player_dir - 1) % 4
-            elif direction == 1:    # Rotate right\
-                self.send_command_to_rpi("right")
-                self.player_dir = (self.player_dir + 1) % 4
+            before = (self.game.x, self.game.y, self.game.heading)
+            if self.game.rotate(direction):
+                command = "left" if direction == 0 else "right"
+                seq = self.send_command_to_rpi(command)
+                if seq is not None:
+                    self.unconfirmed[seq] = (command, *before, None, time.perf_counter())
             else:
                 print("Invalid rotation direction")
-            self.update()
+            self.update(self.player_rect())
+        return seq
 
 
     def keyPressEvent(self, event):
-        """Handles keyboard inputs with cooldown."""
-        current_time = time.time()  # Get the current timestamp
-
-        # Check if enough time has passed since the last key press
-        if current_time - self.last_keypress_time < self.keypress_cooldown:
-            return  # Ignore the key press if it's within the cooldown period
-
-        # Update the last key press time
-        self.last_keypress_time = current_time
+        """Handles keyboard inputs. Player commands go through the input bus, which rate limits them."""
+        # Zoom and pan the view, these don't move the player so they skip the input bus
+        step = self.maze_size // 5
+        if event.key() in (Qt.Key_Plus, Qt.Key_Equal):
+            self.set_zoom(max(self.cell_size + 1, int(self.cell_size * 1.25)))
+            return
+        elif event.key() == Qt.Key_Minus:
+            self.set_zoom(min(self.cell_size - 1, int(self.cell_size / 1.25)))
+            return
+        elif event.key() in (Qt.Key_Left, Qt.Key_Right, Qt.Key_Up, Qt.Key_Down):
+            dx = {Qt.Key_Left: -step, Qt.Key_Right: step}.get(event.key(), 0)
+            dy = {Qt.Key_Up: -step, Qt.Key_Down: step}.get(event.key(), 0)
+            self.scroll_to(self.scroll_x + dx, self.scroll_y + dy)
+            return
 
         # Handle the key press
         if event.key() == Qt.Key_W:
-            self.movePlayer() # Up
+            self.input_bus.post('keyboard', 'forward') # Up
         elif event.key() == Qt.Key_D:
-            self.rotatePlayer(1) # Right
+            self.input_bus.post('keyboard', 'right') # Right
         elif event.key() == Qt.Key_S:
             pass  # Backward movement disabled
         elif event.key() == Qt.Key_A:
-            self.rotatePlayer(0) # Left
+            self.input_bus.post('keyboard', 'left') # Left
         elif event.key() == Qt.Key_Q: # Quit
             self.send_command_to_rpi("stop")
             self.close()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def static_text(self, text):
+        """Text laid out once with the label font, so repaints don't measure it again."""
+        static = self.text_cache.get(text)
+        if static is None:
+            static = self.text_cache[text] = QStaticText(text)
+            static.prepare(QTransform(), self.label_font)
+        return static
+
+    def draw_centered_text(self, painter, text):
+        """Draw a cached text in the middle of the maze."""
+        static = self.static_text(text)
+        size = static.size()
+        painter.drawStaticText(50 + int(self.maze_size - size.width()) // 2, 50 + int(self.maze_size - size.height()) // 2, static)
+
+    def overview_levels(self):
+        """Overview pyramid of the maze (see maze_render.image_pyramid), built on first use."""
+        from maze_render import image_pyramid
+        if self.overview is None:
+            self.overview = (image_pyramid(self.maze), {})  # Levels, and QImages made from them
+        return self.overview[0]
+
+    def overview_image(self, level):
+        """QImage of one level of the maze's overview pyramid. It shares the level's pixels."""
+        pixels = self.overview_levels()[level]
+        images = self.overview[1]
+        image = images.get(level)
+        if image is None:
+            image = images[level] = QImage(pixels.data, pixels.shape[1], pixels.shape[0], pixels.shape[1], QImage.Format_Grayscale8)
+        return image
+
+    def build_tile(self, tile_x, tile_y):
+        """Render one TILE_SIZE square of the maze (start and goal, walls) at the current zoom.
+
+        Tiles are laid out in maze pixels, with (0, 0) at the top-left corner of cell (0, 0).
+        """
+        from maze_grid import MazeGrid
+        from maze_render import wall_runs
+        ratio = self.devicePixelRatioF()
+        tile = QPixmap(int(TILE_SIZE * ratio), int(TILE_SIZE * ratio))
+        tile.setDevicePixelRatio(ratio)
+        tile.fill(Qt.transparent)
+        painter = QPainter(tile)
+        painter.translate(-tile_x * TILE_SIZE, -tile_y * TILE_SIZE)
+        size = self.cell_size
+        color_cell_offset = min(15, size // 4)
+
+        if self.world is None:
+            # START square -- green
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(127, 255, 127))
+            painter.drawRect(QRect(color_cell_offset, color_cell_offset, size - (2 * color_cell_offset), size - (2 * color_cell_offset)))
 
+            # GOAL square -- red
+            painter.setBrush(QColor(255, 127, 127))
+            painter.drawRect(QRect(((self.m - 1) * size) + color_cell_offset, ((self.n - 1) * size) + color_cell_offset, size - (2 * color_cell_offset), size - (2 * color_cell_offset)))
+
+        self.draw_labels(painter)
+
+        # Cells touching the tile, with one extra on each side for the walls on its edges
+        top, bottom = max(0, tile_y * TILE_SIZE // size - 1), min(self.maze.n, (tile_y + 1) * TILE_SIZE // size + 1)
+        left, right = max(0, tile_x * TILE_SIZE // size - 1), min(self.maze.m, (tile_x + 1) * TILE_SIZE // size + 1)
+        if top < bottom and left < right:
+            if size < LINE_DETAIL_CELL:
+                # Too small for separate walls, draw the one pixel per cell overview image scaled up
+                painter.drawImage(QRect(left * size, top * size, (right - left) * size, (bottom - top) * size),
+                                  self.overview_image(0), QRect(left, top, right - left, bottom - top))
+            else:
+                # Maze walls, merged into straight runs and drawn in one batch
+                view = MazeGrid(bottom - top, right - left, self.maze.walls[top:bottom, left:right])
+                (rows, starts, ends), (columns, tops, bottoms) = wall_runs(view)
+                x0, y0 = left * size, top * size
+                lines = [QLine(x0 + start * size, y0 + row * size, x0 + end * size, y0 + row * size)
+                         for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())]
+                lines += [QLine(x0 + column * size, y0 + top * size, x0 + column * size, y0 + bottom * size)
+                          for column, top, bottom in zip(columns.tolist(), tops.tolist(), bottoms.tolist())]
+                painter.setPen(QPen(Qt.black, 2))
+                painter.drawLines(lines)
+
+        painter.end()
+        return tile
+
+    def draw_labels(self, painter):
+        """Draw the start and goal labels, in maze pixels, when the cells are large enough for them."""
+        size = self.cell_size
+        if self.world is not None or size < LABEL_CELL:
+            return
+        painter.setFont(self.label_font)
+
+        # START square -- text
+        painter.setPen(QPen(QColor(0, 0, 0)))
+        text_start = self.static_text("Start")
+        text_start_x = int(size - text_start.size().width()) // 2
+        painter.drawStaticText(text_start_x, 50 - self.label_ascent, text_start)
+
+        # GOAL square -- text
+        text_end = self.static_text("Goal")
+        text_end_x = int(size - text_end.size().width()) // 2
+        painter.drawStaticText(((self.m - 1) * size) + text_end_x, 50 + ((self.n - 1) * size) - self.label_ascent, text_end)
+
+    def tile(self, tile_x, tile_y):
+        """Cached maze tile, built on a cache miss."""
+        key = (tile_x, tile_y)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.tiles[key] = self.build_tile(tile_x, tile_y)
+            if len(self.tiles) > TILE_CACHE_SIZE:
+                self.tiles.popitem(last=False)  # Drop the least recently used tile
+        else:
+            self.tiles.move_to_end(key)
+        return tile
+
+    def draw_maze(self, painter, rect):
+        """Draw the background and the cached maze tiles that cover rect."""
+        # The 2px border walls may stick out of the view, but only where the maze really ends
+        if self.world is not None:
+            view = QRect(50, 50, self.maze_size, self.maze_size)
+        else:
+            left = 48 if self.scroll_x == 0 else 50
+            top = 48 if self.scroll_y == 0 else 50
+            right = 50 + self.maze_size + (2 if self.scroll_x + self.maze_size >= self.m * self.cell_size else 0)
+            bottom = 50 + self.maze_size + (2 if self.scroll_y + self.maze_size >= self.n * self.cell_size else 0)
+            view = QRect(QPoint(left, top), QPoint(right - 1, bottom - 1))
+        area = rect.intersected(view)
+        if area.isEmpty():
+            return
+        painter.setClipRect(area)
         painter.setPen(Qt.NoPen)
         painter.setBrush(QColor(255, 250, 245))
         painter.drawRect(QRect(50, 50, self.maze_size, self.maze_size))
 
-        if not self.game_started:
-            # GAME BEGIN -- text
-            painter.setPen(QPen(QColor(0, 0, 0)))
-            painter.setFont(QFont("Arial", 16, QFont.Bold))
-            text_begin = 'Press "Start" to play'
-            text_begin_rect = painter.boundingRect(0, 0, 0, 0, Qt.AlignLeft, text_begin)
-            text_begin_x = (self.maze_size - text_begin_rect.width()) // 2
-            text_begin_y = (self.maze_size - text_begin_rect.height()) // 2
-            painter.drawText(50 + text_begin_x, 50 + text_begin_y + text_begin_rect.height(), text_begin)
+        origin_x, origin_y = self.origin()
+        for tile_y in range((area.top() - origin_y) // TILE_SIZE, (area.bottom() - origin_y) // TILE_SIZE + 1):
+            for tile_x in range((area.left() - origin_x) // TILE_SIZE, (area.right() - origin_x) // TILE_SIZE + 1):
+                painter.drawPixmap(origin_x + tile_x * TILE_SIZE, origin_y + tile_y * TILE_SIZE, self.tile(tile_x, tile_y))
+        painter.setClipping(False)
+
+    def draw_minimap(self, painter, rect):
+        """Draw the whole maze from the overview pyramid, with the view and the player marked."""
+        from maze_render import pyramid_level
+        if self.minimap is None:
+            level = pyramid_level(self.overview_levels(), max(rect.width(), rect.height()))
+            image = self.overview_image(level)
+            self.minimap = QPixmap.fromImage(image.scaled(rect.size(), Qt.IgnoreAspectRatio, Qt.SmoothTransformation))
+        painter.drawPixmap(rect.topLeft(), self.minimap)
+
+        scale_x, scale_y = rect.width() / (self.m * self.cell_size), rect.height() / (self.n * self.cell_size)
+        painter.setPen(QPen(QColor(0, 0, 255), 1))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(QRect(rect.left() + int(self.scroll_x * scale_x), rect.top() + int(self.scroll_y * scale_y),
+                               max(2, int(self.maze_size * scale_x)), max(2, int(self.maze_size * scale_y))))
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(Qt.red)
+        painter.drawEllipse(QPoint(rect.left() + int((self.player_x + 0.5) * rect.width() / self.m),
+                                   rect.top() + int((self.player_y + 0.5) * rect.height() / self.n)), 3, 3)
+
+    def draw_explored(self, painter, rect):
+        """Shade the explored cells (or, with fog of war, cover the unexplored ones) inside rect only."""
+        import numpy as np
+        top, bottom, left, right = self.visible_cells(rect)
+        if top >= bottom or left >= right:
+            return
+        size = self.cell_size
+        origin_x, origin_y = self.origin()
+        cells = self.visited[top:bottom, left:right]
+        if not self.fog_of_war and not cells.any():
+            return  # No trail here
+
+        # One ARGB pixel per cell, scaled up to the cell size when drawn
+        if self.fog_of_war:
+            pixels = np.where(cells, np.uint32(0), np.uint32(FOG_COLOR))
         else:
-            color_cell_offset = 15
-
-            # START square -- green
-            painter.setBrush(QColor(127, 255, 127))
-            painter.drawRect(QRect(50 + color_cell_offset, 50 + color_cell_offset, self.cell_size - (2 * color_cell_offset), self.cell_size - (2 * color_cell_offset)))
+            pixels = np.where(cells, np.uint32(TRAIL_COLOR), np.uint32(0))
+        image = QImage(pixels.data, right - left, bottom - top, 4 * (right - left), QImage.Format_ARGB32_Premultiplied)
+        painter.setClipRect(QRect(50, 50, self.maze_size, self.maze_size))
+        painter.drawImage(QRect(origin_x + left * size, origin_y + top * size, (right - left) * size, (bottom - top) * size), image)
+        painter.setClipping(False)
+
+    def draw_begin_screen(self, painter):
+        """Draw the empty maze view shown before the first maze."""
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(255, 250, 245))
+        painter.drawRect(QRect(50, 50, self.maze_size, self.maze_size))
 
-            # GOAL square -- red
-            painter.setBrush(QColor(255, 127, 127))
-            painter.drawRect(QRect(50 + ((self.m - 1) * self.cell_size) + color_cell_offset, 50 + ((self.n - 1) * self.cell_size) + color_cell_offset, self.cell_size - (2 * color_cell_offset), self.cell_size - (2 * color_cell_offset)))
+        # GAME BEGIN -- text
+        painter.setPen(QPen(QColor(0, 0, 0)))
+        painter.setFont(self.label_font)
+        self.draw_centered_text(painter, 'Press "Start" to play')
 
-            # START square -- text
+    def draw_overlays(self, painter):
+        """Draw what goes over the maze: the win message and the player."""
+        # GAME OVER -- text
+        if self.game_over:
             painter.setPen(QPen(QColor(0, 0, 0)))
-            painter.setFont(QFont("Arial", 16, QFont.Bold))
-            text_start = "Start"
-            text_start_rect = painter.boundingRect(0, 0, 0, 0, Qt.AlignLeft, text_start)
-            text_start_x = (self.cell_size - text_start_rect.width()) // 2
-            text_start_y = (self.cell_size - text_start_rect.height()) // 2
-            painter.drawText(50 + text_start_x, 50 + 50, text_start)
-
-            # GOAL square -- text
-            text_end = "Goal"
-            text_end_rect = painter.boundingRect(0, 0, 0, 0, Qt.AlignLeft, text_start)
-            text_end_x = (self.cell_size - text_end_rect.width()) // 2
-            text_end_y = (self.cell_size - text_end_rect.height()) // 2
-            painter.drawText(50 + ((self.m - 1) * self.cell_size) + text_end_x, 50 + 50 + ((self.n - 1) * self.cell_size), text_end)
-
-            # GAME OVER -- text
-            if self.game_over:
-                text_win = "You won!"
-                text_win_rect = painter.boundingRect(0, 0, 0, 0, Qt.AlignLeft, text_win)
-                text_win_x = (self.maze_size - text_win_rect.width()) // 2
-                text_win_y = (self.maze_size - text_win_rect.height()) // 2
-                painter.drawText(50 + text_win_x, 50 + text_win_y + text_win_rect.height(), text_win)
-
-            # Prep for drawing maze walls
-            painter.setPen(QPen(Qt.black, 2))
-
-            for x in range(self.n):
-                for y in range(self.m):
-                    cell = self.maze[x][y]
-                    cx, cy = 50 + y * self.cell_size, 50 + x * self.cell_size       # UI Padding to top and left
-                    # cx, cy = y * self.cell_size, x * self.cell_size
-                    if cell['walls'][0]:  # Top wall
-                        painter.drawLine(cx, cy, cx + self.cell_size, cy)
-                    if cell['walls'][1]:  # Right wall
-                        painter.drawLine(cx + self.cell_size, cy, cx + self.cell_size, cy + self.cell_size)
-                    if cell['walls'][2]:  # Bottom wall
-                        painter.drawLine(cx, cy + self.cell_size, cx + self.cell_size, cy + self.cell_size)
-                    if cell['walls'][3]:  # Left wall
-                        painter.drawLine(cx, cy, cx, cy + self.cell_size)
-
-            painter.setBrush(Qt.red)
-            player_pos = QPoint(50 + int(self.cell_size * (self.player_x + 0.5)), 50 + int(self.cell_size * (self.player_y + 0.5)))
-
-            arrow = QPolygon([
-                QPoint(player_pos.x(), player_pos.y() - 25),  # Top (point)
-                QPoint(player_pos.x() - 20, player_pos.y() + 25),  # Left (tail)
-                QPoint(player_pos.x(), player_pos.y() + 10), # Center
-                QPoint(player_pos.x() + 20, player_pos.y() + 25),  # Right (tail)
-            ])
-
-            painter.translate(player_pos)
-            painter.rotate(self.player_dir * 90)  # 0: North, 1: East, 2: South, 3: West
-            painter.translate(-player_pos)
-            painter.drawPolygon(arrow)
-
-            # painter.setBrush(Qt.NoBrush)
+            painter.setFont(self.label_font)
+            self.draw_centered_text(painter, "You won!")
+
+        origin_x, origin_y = self.origin()
+        player_pos = QPoint(origin_x + int(self.cell_size * (self.player_x - self.view_x + 0.5)), origin_y + int(self.cell_size * (self.player_y - self.view_y + 0.5)))
+        if not QRect(50, 50, self.maze_size, self.maze_size).contains(player_pos):
+            return  # Scrolled out of view
+
+        painter.setPen(QPen(Qt.black, 2))
+        painter.setBrush(Qt.red)
+        arrow = QPolygon([
+            QPoint(player_pos.x(), player_pos.y() - 25),  # Top (point)
+            QPoint(player_pos.x() - 20, player_pos.y() + 25),  # Left (tail)
+            QPoint(player_pos.x(), player_pos.y() + 10), # Center
+            QPoint(player_pos.x() + 20, player_pos.y() + 25),  # Right (tail)
+        ])
+
+        painter.translate(player_pos)
+        painter.rotate(self.player_dir * 90)  # 0: North, 1: East, 2: South, 3: West
+        painter.scale(self.arrow_scale(), self.arrow_scale())
+        painter.translate(-player_pos)
+        painter.drawPolygon(arrow)
+
+    def paintEvent(self, event):
+        if not self.first_frame_shown:
+            self.first_frame_shown = True
+            QTimer.singleShot(0, self.after_first_frame)
+        painter = QPainter(self)
+
+        if not self.game_started:
+            self.draw_begin_screen(painter)
+            return
+
+        # Background, start and goal, and walls, from tiles that only change with the maze or the zoom
+        # (the OpenGL view draws all of the maze view itself)
+        if self.gl_view is None:
+            self.draw_maze(painter, event.rect())
+            if self.visited is not None:
+                self.draw_explored(painter, event.rect())
+
+        painter.setPen(QPen(QColor(0, 0, 0)))
+        painter.setFont(self.label_font)
+        if self.world is None:
+            # HINTS -- text
+            text_hint = f"Cells remaining: {self.cells_remaining}" + ("" if self.on_optimal_path else " (off the optimal path)")
+            painter.drawText(50, 50 + self.maze_size + 30, text_hint)
+        else:
+            # ENDLESS -- text
+            text_endless = f"Position: ({self.player_x}, {self.player_y})  Chunks loaded: {len(self.world)}"
+            painter.drawText(50, 50 + self.maze_size + 30, text_endless)
+
+        # MINIMAP -- only while the maze is larger than the view
+        minimap = self.minimap_rect()
+        if minimap is not None and event.rect().intersects(minimap.adjusted(-3, -3, 3, 3)):
+            self.draw_minimap(painter, minimap)
+
+        if self.gl_view is None:
+            self.draw_overlays(painter)
+
+    def wheelEvent(self, event):
+        """Zoom the view around the mouse pointer."""
+        if self.game_started and event.angleDelta().y():
+            factor = 1.25 if event.angleDelta().y() > 0 else 1 / 1.25
+            cell_size = int(self.cell_size * factor)
+            if cell_size == self.cell_size:
+                cell_size += 1 if factor > 1 else -1
+            self.set_zoom(cell_size, event.pos())
+
+    def mousePressEvent(self, event):
+        """Jump to a spot clicked on the minimap, or start dragging the view."""
+        minimap = self.minimap_rect()
+        if minimap is not None and minimap.contains(event.pos()):
+            self.center_on((event.pos().x() - minimap.left()) * self.m / minimap.width(),
+                           (event.pos().y() - minimap.top()) * self.n / minimap.height())
+        elif QRect(50, 50, self.maze_size, self.maze_size).contains(event.pos()):
+            self.drag_start = (event.pos(), self.scroll_x, self.scroll_y)
+
+    def mouseMoveEvent(self, event):
+        """Pan the view while dragging."""
+        if self.drag_start is not None:
+            pos, scroll_x, scroll_y = self.drag_start
+            self.scroll_to(scroll_x - (event.pos().x() - pos.x()), scroll_y - (event.pos().y() - pos.y()))
+
+    def mouseReleaseEvent(self, event):
+        self.drag_start = None
 
 # Running the application
 if __name__ == "__main__":
-    multiprocessing.freeze_support()  # Fix for PyInstaller multi-threading issue
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()  # Fix for PyInstaller multi-threading issue
 
     app = QApplication(sys.argv)
+    startup_mark("QApplication")
     n, m = 3, 3  # Dimensions of the maze (N x M)
-    window = MazeWindow(n, m)
+    window = MazeWindow(n, m, udp='--udp' in sys.argv)  # --udp: talk to the Raspberry Pis over maze_udp
+    window.report_startup = '--startup-time' in sys.argv  # e.g. `time ./maze --startup-time` for the packaged binary
+    startup_mark("window")
     window.show()
     sys.exit(app.exec_())
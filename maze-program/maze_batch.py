@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import argparse
+import os
+import time
+import numpy as np
+from maze_grid import GENERATORS, generate_maze
+
+
+def _generate_chunk(args):
+    """Process pool worker: generate a run of seeded mazes straight into the shared wall array."""
+    name, n, m, algorithm, start, seeds = args
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out = np.ndarray((len(seeds), n, m), dtype=np.uint8, buffer=shm.buf, offset=start * n * m)
+        for i, seed in enumerate(seeds):
+            out[i] = generate_maze(n, m, algorithm, seed=seed).walls
+        del out  # Release the buffer before closing
+    finally:
+        shm.close()
+    return len(seeds)
+
+
+@contextmanager
+def shared_batch(n, m, seeds, algorithm='backtracking', workers=None):
+    """Generate one N x M maze per seed across a process pool.
+
+    Yields a (len(seeds), n, m) uint8 wall array backed by shared memory. Workers write into it
+    directly, so no per-maze data is pickled back. The memory is released when the block exits.
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, len(seeds) // (workers * 4))  # Several chunks per worker to balance the load
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(seeds) * n * m))
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            jobs = [(shm.name, n, m, algorithm, start, seeds[start:start + chunk_size])
+                    for start in range(0, len(seeds), chunk_size)]
+            for _ in executor.map(_generate_chunk, jobs):
+                pass
+        walls = np.ndarray((len(seeds), n, m), dtype=np.uint8, buffer=shm.buf)
+        try:
+            yield walls
+        finally:
+            del walls
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def generate_batch(n, m, seeds, algorithm='backtracking', workers=None):
+    """Generate one N x M maze per seed across a process pool, returning a (len(seeds), n, m) wall array."""
+    with shared_batch(n, m, seeds, algorithm, workers) as walls:
+        return walls.copy()
+
+
+# Batch generation from the command line, e.g. `python maze_batch.py 50 50 10000 -o mazes.npy`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate many seeded mazes in parallel.")
+    parser.add_argument('n', type=int, help="maze rows")
+    parser.add_argument('m', type=int, help="maze columns")
+    parser.add_argument('count', type=int, help="number of mazes")
+    parser.add_argument('--algorithm', default='backtracking', choices=GENERATORS.keys())
+    parser.add_argument('--first-seed', type=int, default=0, help="seeds are first-seed .. first-seed + count - 1")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('-o', '--output', help="save the (count, n, m) wall array as a .npy file")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    seeds = range(args.first_seed, args.first_seed + args.count)
+    with shared_batch(args.n, args.m, seeds, args.algorithm, args.workers) as walls:
+        elapsed = time.perf_counter() - start_time
+        print(f"Generated {args.count} {args.n}x{args.m} {args.algorithm} mazes in {elapsed:.2f}s "
+              f"({args.count / elapsed:.0f} mazes/s)")
+        if args.output:
+            np.save(args.output, walls)
+            print(f"Saved to {args.output}")
@@ -0,0 +1,270 @@
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Render without a display
+
+from PyQt5.QtWidgets import QApplication, QWidget
+from PyQt5.QtGui import QImage, QRegion
+from PyQt5.QtCore import QPoint, QRect, QT_VERSION_STR
+import argparse
+import datetime
+import gc
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+from maze_grid import DIRECTIONS
+from maze import MazeWindow
+
+
+class BenchWindow(MazeWindow):
+    """MazeWindow with no robot, controller or microphone, that collects its repaint requests."""
+
+    def __init__(self, n, m, library_path=None):
+        self.dirty = QRegion()
+        super().__init__(n, m, library_path=library_path)
+        self.start_engine()  # No first frame is shown here, so load the engine now
+        self.prefetcher.stop()  # A maze built in the background would steal time from the frames
+        self.prefetcher.thread.join()
+
+    def start_connections(self):
+        pass
+
+    def listen(self):
+        pass
+
+    def update(self, *args):
+        """Remember the area to repaint instead of scheduling a paint event."""
+        super().update(*args)
+        self.dirty += QRect(*args) if args else self.rect()
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, QRegion()
+        return dirty
+
+
+def turn_to(window, heading):
+    """Rotate the player to face heading, one frame per turn."""
+    while window.player_dir != heading:
+        window.rotatePlayer(1 if (heading - window.player_dir) % 4 == 1 else 0)
+        yield
+
+
+def solve(window, rng):
+    """Walk the shortest path to the goal, then start over."""
+    while True:
+        if window.game_over:
+            window.restart_maze()
+            yield
+        x, y = window.player_y, window.player_x
+        distance = window.hints.distance
+        for heading, (dx, dy) in enumerate(DIRECTIONS):
+            if window.game.can_move(heading) and distance[x + dx, y + dy] < distance[x, y]:
+                yield from turn_to(window, heading)
+                break
+        window.movePlayer()
+        yield
+
+
+def wander(window, rng):
+    """Random walk: turn to a random open side and step."""
+    while True:
+        if window.game_over:
+            window.restart_maze()
+            yield
+        heading = rng.choice([heading for heading in range(4) if window.game.can_move(heading)])
+        yield from turn_to(window, heading)
+        window.movePlayer()
+        yield
+
+
+def pan(window, rng):
+    """Scroll across the maze row by row, a fifth of the view per frame (no-op frames while it all fits)."""
+    step = window.maze_size // 5
+    while True:
+        for scroll_y in range(0, max(1, window.n * window.cell_size - window.maze_size + step), step):
+            for scroll_x in range(0, max(1, window.m * window.cell_size - window.maze_size + step), step):
+                window.scroll_to(scroll_x, scroll_y)
+                yield
+
+
+def zoom(window, rng):
+    """Zoom in towards the player and back out to the whole maze."""
+    fit = window.fit_cell_size()
+    while True:
+        while window.cell_size < window.maze_size // 2:
+            window.set_zoom(max(window.cell_size + 1, int(window.cell_size * 1.25)))
+            window.center_on(window.player_x, window.player_y)
+            yield
+        while window.cell_size > fit:
+            window.set_zoom(min(window.cell_size - 1, int(window.cell_size / 1.25)))
+            yield
+
+
+# Move sequences selectable by name; each step of the generator is one frame
+SEQUENCES = {
+    'solve': solve,
+    'wander': wander,
+    'pan': pan,
+    'zoom': zoom,
+}
+RENDERERS = ('qpainter', 'opengl')
+
+
+def render(window, image, region):
+    """Paint region of the window into image. Returns the time taken in seconds."""
+    if region.isEmpty():
+        return 0.0  # Nothing to repaint (render() would take an empty region to mean the whole window)
+    start_time = time.perf_counter()
+    window.render(image, QPoint(), region, QWidget.DrawWindowBackground | QWidget.DrawChildren)
+    return time.perf_counter() - start_time
+
+
+def run_scenario(size, renderer, fog, sequence, frames, seed, full_frames=False, library_path=None):
+    """Time the frames of one move sequence on a new size x size maze, kept in the library at library_path.
+
+    Returns a result dict with the per-frame mean and p99 in milliseconds and the time from starting
+    the maze generation to the end of the first paint, or None if the renderer is not available.
+    """
+    window = BenchWindow(size, size, library_path)
+    window.resize(1000, 900)
+    if renderer == 'opengl':
+        window.opengl_button.setChecked(True)
+        window.toggle_opengl()
+        if window.gl_view is None:
+            window.close()
+            window.maze_library.close()
+            return None
+    window.fog_button.setChecked(fog)
+    window.toggle_fog_of_war()
+    image = QImage(window.size(), QImage.Format_ARGB32_Premultiplied)
+    gc.collect()
+
+    # Generate to first paint: the maze, its hints and a full frame
+    window.seed_input.setText(str(seed))
+    start_time = time.perf_counter()
+    window.regenerate_maze()
+    render(window, image, QRegion(window.rect()))
+    first_paint = time.perf_counter() - start_time
+    window.take_dirty()
+
+    times = []
+    steps = SEQUENCES[sequence](window, random.Random(seed))
+    for _ in range(frames):
+        next(steps)
+        dirty = window.take_dirty()
+        times.append(render(window, image, QRegion(window.rect()) if full_frames else dirty))
+    window.close()
+    window.maze_library.close()
+
+    times = np.array(times) * 1000
+    return {
+        'size': size,
+        'renderer': renderer,
+        'fog': fog,
+        'sequence': sequence,
+        'full_frames': full_frames,
+        'frames': frames,
+        'mean_ms': float(times.mean()),
+        'p99_ms': float(np.percentile(times, 99)),
+        'first_paint_ms': first_paint * 1000,
+    }
+
+
+def scenario_key(result):
+    return (result['size'], result['renderer'], result['fog'], result['sequence'], result['full_frames'])
+
+
+def load_runs(path):
+    """Stored benchmark runs, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_run(path, run):
+    runs = load_runs(path)
+    runs.append(run)
+    with open(path, 'w') as f:
+        json.dump(runs, f, indent=1)
+
+
+def change(new, old):
+    """Relative change from old to new as text, e.g. '+12%'."""
+    if old is None or old == 0:
+        return ''
+    return f"{(new - old) / old:+.0%}"
+
+
+def print_results(results, baseline=None):
+    """Print a result table, with the change from the matching scenarios of a baseline run."""
+    previous = {scenario_key(result): result for result in (baseline or {}).get('results', [])}
+    if baseline:
+        print(f"Compared with run {baseline['label'] or baseline['time']} from {baseline['time']}")
+    print(f"{'size':>6} {'renderer':>9} {'fog':>4} {'sequence':>8} {'frames':>6} {'mean ms':>8} {'':>5} "
+          f"{'p99 ms':>8} {'':>5} {'1st paint ms':>12} {'':>5}")
+    for result in results:
+        old = previous.get(scenario_key(result), {})
+        sequence = result['sequence'] + ('*' if result['full_frames'] else '')
+        print(f"{result['size']:>6} {result['renderer']:>9} {'on' if result['fog'] else 'off':>4} {sequence:>8} "
+              f"{result['frames']:>6} {result['mean_ms']:>8.2f} {change(result['mean_ms'], old.get('mean_ms')):>5} "
+              f"{result['p99_ms']:>8.2f} {change(result['p99_ms'], old.get('p99_ms')):>5} "
+              f"{result['first_paint_ms']:>12.1f} {change(result['first_paint_ms'], old.get('first_paint_ms')):>5}")
+
+
+# Rendering benchmarks from the command line, e.g. `python maze_bench.py --sizes 10 100 500 --label baseline`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time MazeWindow frames rendered offscreen into a QImage.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500], help="square maze sizes")
+    parser.add_argument('--renderers', nargs='+', default=['qpainter'], choices=RENDERERS)
+    parser.add_argument('--sequences', nargs='+', default=list(SEQUENCES), choices=SEQUENCES.keys())
+    parser.add_argument('--fog', action='store_true', help="also run every scenario with fog of war")
+    parser.add_argument('--full-frames', action='store_true', help="repaint the whole window every frame "
+                        "instead of only the areas the window asked to update (marked * in the table)")
+    parser.add_argument('--frames', type=int, default=200, help="frames per scenario")
+    parser.add_argument('--seed', type=int, default=1, help="maze seed")
+    parser.add_argument('--label', default='', help="name of this run in the results file")
+    parser.add_argument('--results', default='maze_bench.json', help="results file, each run is appended to it")
+    parser.add_argument('--compare', metavar='LABEL', help="compare with the last run with this label "
+                        "(default: the last stored run)")
+    parser.add_argument('--no-save', action='store_true', help="don't store this run")
+    args = parser.parse_args()
+
+    results_path = os.path.abspath(args.results)
+    runs = load_runs(results_path)
+    if args.compare:
+        baseline = next((run for run in reversed(runs) if run['label'] == args.compare), None)
+        if baseline is None:
+            parser.error(f"no stored run labelled {args.compare!r} in {results_path}")
+    else:
+        baseline = runs[-1] if runs else None
+
+    app = QApplication(sys.argv)
+    results = []
+    for size in args.sizes:
+        for renderer in args.renderers:
+            for fog in ((False, True) if args.fog else (False,)):
+                for sequence in args.sequences:
+                    # Each scenario gets a throwaway maze library, so its maze is always generated afresh
+                    with tempfile.TemporaryDirectory() as workdir:
+                        result = run_scenario(size, renderer, fog, sequence, args.frames, args.seed, args.full_frames,
+                                              os.path.join(workdir, 'maze_library.bin'))
+                    if result is None:
+                        print(f"Skipping the {renderer} renderer, it is not available here")
+                        break
+                    results.append(result)
+
+    print_results(results, baseline)
+    if not args.no_save:
+        save_run(results_path, {
+            'label': args.label,
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'qpa': os.environ['QT_QPA_PLATFORM'],
+            'results': results,
+        })
+        print(f"Saved to {results_path}")
@@ -0,0 +1,114 @@
+import math
+import os
+import random
+from maze_grid import generate_maze
+from maze_solver import OPEN_COUNT, open_mask, dead_end_fill
+
+# Open masks of a path cell that goes straight through (Top+Bottom, Right+Left)
+STRAIGHT = (0b0101, 0b1010)
+
+# Difficulty presets: metric -> (min, max) band. find_seed fits the solution_fraction band to the
+# maze size first, see fit_target
+DIFFICULTIES = {
+    'easy': {'solution_fraction': (0.0, 0.25)},
+    'medium': {'solution_fraction': (0.25, 0.45)},
+    'hard': {'solution_fraction': (0.45, 1.0), 'dead_ends_fraction': (0.1, 1.0)},
+}
+
+
+def maze_metrics(grid, start, goal):
+    """Vectorized difficulty metrics of a maze, for the route from start to goal (both (x, y))."""
+    cells = grid.n * grid.m
+    degree = OPEN_COUNT[open_mask(grid)]
+    dead_ends = int((degree == 1).sum())
+    junctions = int((degree >= 3).sum())
+    passages = int(degree.sum()) // 2
+
+    # After dead-end filling only the solution path is left open, with its own connections
+    path = dead_end_fill(grid, (start, goal))
+    on_path = path != 0
+    on_path[start] = on_path[goal] = True
+    solution_cells = int(on_path.sum())
+    turns = int(((OPEN_COUNT[path] == 2) & (path != STRAIGHT[0]) & (path != STRAIGHT[1])).sum())
+
+    # Every corridor cell (two openings) joins two passages into one corridor
+    corridors = passages - int((degree == 2).sum())
+
+    return {
+        'dead_ends': dead_ends,
+        'dead_ends_fraction': dead_ends / cells,
+        'junctions': junctions,
+        'solution_length': solution_cells - 1,
+        'solution_fraction': solution_cells / cells,
+        'solution_turns': turns,
+        'average_corridor_length': passages / corridors if corridors > 0 else float(passages),
+    }
+
+
+def in_band(metrics, target):
+    """Check whether every metric named in target lies inside its (min, max) band."""
+    return all(low <= metrics[name] <= high for name, (low, high) in target.items())
+
+
+def fit_target(n, m, target):
+    """Copy of target with its solution_fraction band fitted to an N x M maze.
+
+    The solution from corner to corner covers at least n + m - 1 cells, which is most of a small
+    maze, so the band is read as a fraction of the range from that shortest solution to all cells.
+    """
+    if 'solution_fraction' not in target:
+        return dict(target)
+    shortest = (n + m - 1) / (n * m)
+    low, high = target['solution_fraction']
+    return {**target, 'solution_fraction': (shortest + low * (1 - shortest), shortest + high * (1 - shortest))}
+
+
+def reachable(n, m, target):
+    """Check whether any N x M maze can have a solution whose length lies in target's solution_fraction band."""
+    if 'solution_fraction' not in target:
+        return True
+    cells = n * m
+    shortest = n + m - 1
+    low, high = target['solution_fraction']
+    # Every solution from corner to corner is the shortest one plus an even number of cells
+    length = max(shortest, math.ceil(low * cells - 1e-9))
+    length += (length - shortest) % 2
+    return length <= min(cells, math.floor(high * cells + 1e-9))
+
+
+def _seed_metrics(args):
+    """Process pool worker: generate one seeded maze and measure it."""
+    n, m, algorithm, seed = args
+    grid = generate_maze(n, m, algorithm, seed=seed)
+    return seed, maze_metrics(grid, (0, 0), (n - 1, m - 1))
+
+
+def find_seed(n, m, target, algorithm='backtracking', first_seed=None, batch_size=None, max_batches=20):
+    """Search seeds in parallel batches for an N x M maze whose metrics lie inside the target band.
+
+    target is a preset name from DIFFICULTIES, whose bands are fitted to the maze size, or a
+    {metric: (min, max)} dict. Returns (seed, metrics) for the first matching seed, or None if none
+    was found within max_batches or no maze of this size can be in the band.
+    """
+    # Pulls in multiprocessing, so only when searching
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    if isinstance(target, str):
+        target = fit_target(n, m, DIFFICULTIES[target])
+    if not reachable(n, m, target):
+        return None
+    if first_seed is None:
+        first_seed = random.randrange(2**32)
+    batch_size = batch_size or os.cpu_count() or 1
+
+    # Spawned, not forked: the search runs on maze.py's prefetch thread, and forking a process with
+    # Qt and other threads running can leave the children holding locks that are never released
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as executor:
+        for batch in range(max_batches):
+            start = first_seed + batch * batch_size
+            jobs = [(n, m, algorithm, seed) for seed in range(start, start + batch_size)]
+            for seed, metrics in executor.map(_seed_metrics, jobs):
+                if in_band(metrics, target):
+                    return seed, metrics
+    return None
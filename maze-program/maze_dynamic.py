@@ -0,0 +1,166 @@
+import heapq
+import random
+import numpy as np
+from maze_grid import WALL_BITS, ALL_WALLS, DIRECTIONS
+from maze_solver import _bfs, _steps
+
+INF = float('inf')
+
+
+class MazeShifter:
+    """Shifts the walls of a perfect maze while keeping it perfect, using origin shift.
+
+    Every cell points at a neighbour on its way to the origin cell, and those links are exactly the
+    open passages. Moving the origin to a random neighbour opens at most one wall and closes at most one.
+    """
+
+    def __init__(self, grid, rng=random):
+        self.grid = grid
+        self.rng = rng
+        n, m = grid.n, grid.m
+        self.origin = (n - 1) * m + (m - 1)
+
+        # Link every cell to its neighbour one step closer to the origin (vectorized per direction)
+        dist = _bfs(grid, self.origin).reshape(n, m)
+        closer = dist - 1
+        opened = ~grid.walls & ALL_WALLS
+        parent = np.full((n, m), -1, dtype=np.int8)  # Direction of each cell's link, -1 for the origin
+        parent[1:][(opened[1:] & WALL_BITS[0]).astype(bool) & (dist[:-1] == closer[1:])] = 0
+        parent[:, :-1][(opened[:, :-1] & WALL_BITS[1]).astype(bool) & (dist[:, 1:] == closer[:, :-1])] = 1
+        parent[:-1][(opened[:-1] & WALL_BITS[2]).astype(bool) & (dist[1:] == closer[:-1])] = 2
+        parent[:, 1:][(opened[:, 1:] & WALL_BITS[3]).astype(bool) & (dist[:, :-1] == closer[:, 1:])] = 3
+        self.parent = parent.reshape(-1)
+
+    def shift(self, count=1):
+        """Move the origin count times. Returns the changed walls as (x, y, wall_idx) entries."""
+        n, m = self.grid.n, self.grid.m
+        changed = []
+        for _ in range(count):
+            x, y = divmod(self.origin, m)
+            options = [d for d, (dx, dy) in enumerate(DIRECTIONS) if 0 <= x + dx < n and 0 <= y + dy < m]
+            if not options:
+                return changed  # A 1x1 maze has no walls to move
+            wall_idx = options[int(self.rng.random() * len(options))]
+            dx, dy = DIRECTIONS[wall_idx]
+            nxt = (x + dx) * m + (y + dy)
+            old = int(self.parent[nxt])
+
+            # The origin now links to its neighbour, which becomes the new origin
+            self.parent[self.origin] = wall_idx
+            self.parent[nxt] = -1
+            if old != (wall_idx + 2) % 4:
+                # The new origin's old link closes and the new one opens (otherwise it's the same passage)
+                self.grid.remove_wall(x, y, wall_idx)
+                self.grid.add_wall(x + dx, y + dy, old)
+                changed.append((x, y, wall_idx))
+                changed.append((x + dx, y + dy, old))
+            self.origin = nxt
+        return changed
+
+
+class DStarLite:
+    """Incremental shortest paths to a fixed goal on a maze whose walls change (D* Lite).
+
+    The search runs backwards from the goal. When walls change or the start moves, only the cells
+    whose distance is affected are repaired, instead of searching again from scratch.
+    """
+
+    def __init__(self, grid, start, goal):
+        self.grid = grid
+        self.m = grid.m
+        self.walls = memoryview(grid.walls.reshape(-1))  # Shares the grid's wall bits
+        self.steps = _steps(grid.m)
+        self.goal = goal[0] * self.m + goal[1]
+        self.start = self.last = start[0] * self.m + start[1]
+        self.km = 0
+        self.g = {}
+        self.rhs = {self.goal: 0}
+        self.queue = []
+        self.queued = {}  # cell -> key of its live queue entry
+        self._push(self.goal)
+        self._compute()
+
+    def _h(self, a, b):
+        """Manhattan distance between two flat cells."""
+        ax, ay = divmod(a, self.m)
+        bx, by = divmod(b, self.m)
+        return abs(ax - bx) + abs(ay - by)
+
+    def _key(self, cell):
+        best = min(self.g.get(cell, INF), self.rhs.get(cell, INF))
+        return (best + self._h(self.start, cell) + self.km, best)
+
+    def _push(self, cell):
+        key = self._key(cell)
+        self.queued[cell] = key
+        heapq.heappush(self.queue, (key, cell))
+
+    def _neighbours(self, cell):
+        bits = self.walls[cell]
+        return [cell + self.steps[wall_idx] for wall_idx in range(4) if not bits & WALL_BITS[wall_idx]]
+
+    def _update(self, cell):
+        if cell != self.goal:
+            self.rhs[cell] = min((self.g.get(nxt, INF) + 1 for nxt in self._neighbours(cell)), default=INF)
+        self.queued.pop(cell, None)  # Lazy removal, stale heap entries are skipped
+        if self.g.get(cell, INF) != self.rhs.get(cell, INF):
+            self._push(cell)
+
+    def _compute(self):
+        queue, queued = self.queue, self.queued
+        while queue:
+            key, cell = queue[0]
+            if queued.get(cell) != key:
+                heapq.heappop(queue)  # Stale entry
+                continue
+            start = self.start
+            if key >= self._key(start) and self.rhs.get(start, INF) == self.g.get(start, INF):
+                break
+
+            heapq.heappop(queue)
+            del queued[cell]
+            new_key = self._key(cell)
+            if key < new_key:
+                self._push(cell)
+            elif self.g.get(cell, INF) > self.rhs.get(cell, INF):
+                self.g[cell] = self.rhs[cell]
+                for nxt in self._neighbours(cell):
+                    self._update(nxt)
+            else:
+                self.g[cell] = INF
+                self._update(cell)
+                for nxt in self._neighbours(cell):
+                    self._update(nxt)
+
+    def move_start(self, start):
+        """The player moved to start (x, y); repair the path from there."""
+        cell = start[0] * self.m + start[1]
+        if cell != self.start:
+            self.start = cell
+            self.km += self._h(self.last, cell)
+            self.last = cell
+            self._compute()
+
+    def update_walls(self, changed):
+        """Repair distances after walls changed. changed holds (x, y, wall_idx) entries."""
+        for x, y, wall_idx in changed:
+            cell = x * self.m + y
+            self._update(cell)
+            self._update(cell + self.steps[wall_idx])
+        self._compute()
+
+    def distance(self):
+        """Moves from the start to the goal, or None if the goal can't be reached."""
+        best = self.g.get(self.start, INF)
+        return None if best == INF else int(best)
+
+    def next_heading(self):
+        """Heading of the next move on a shortest path from the start, or None at (or cut off from) the goal."""
+        best, heading = self.g.get(self.start, INF), None
+        if self.start == self.goal or best == INF:
+            return None
+        bits = self.walls[self.start]
+        for wall_idx in range(4):
+            if not bits & WALL_BITS[wall_idx] and self.g.get(self.start + self.steps[wall_idx], INF) < best:
+                best, heading = self.g[self.start + self.steps[wall_idx]], wall_idx
+        return heading
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+import random
+import numpy as np
+from maze_grid import WALL_BITS, ALL_WALLS, MazeGrid, generate_maze
+from maze_game import MazeGame, RIGHT
+
+
+class ChunkedMaze:
+    """Unbounded maze made of size x size chunks, generated on demand from a world seed.
+
+    Cells use the same (x, y) = (row, column) layout as MazeGrid, but coordinates may be any
+    integer, including negative ones. Each chunk is a perfect maze seeded by its chunk coordinates,
+    and every border between two chunks gets one opening chosen from the world seed and the border's
+    position, so both neighbours agree on it without having to look at each other. Only the most
+    recently used chunks are kept, so memory stays bounded however far the player travels.
+    """
+
+    def __init__(self, world_seed, chunk_size=8, algorithm='backtracking', cache_size=64):
+        self.world_seed = world_seed
+        self.size = chunk_size
+        self.algorithm = algorithm
+        self.cache_size = cache_size
+        self.chunks = OrderedDict()  # (chunk x, chunk y) -> wall array, least recently used first
+        self.generated = 0  # Chunks built so far, including ones that were evicted and rebuilt
+
+    def _border(self, side, cx, cy):
+        """Offset of the opening on the bottom or right border of chunk (cx, cy)."""
+        return random.Random(f"{self.world_seed}:{side}:{cx},{cy}").randrange(self.size)
+
+    def _generate(self, cx, cy):
+        """Build the walls of chunk (cx, cy), including the openings to its four neighbours."""
+        size = self.size
+        walls = generate_maze(size, size, self.algorithm, seed=f"{self.world_seed}:{cx},{cy}").walls
+        walls[0, self._border('bottom', cx - 1, cy)] &= ALL_WALLS ^ WALL_BITS[0]
+        walls[self._border('right', cx, cy - 1), 0] &= ALL_WALLS ^ WALL_BITS[3]
+        walls[size - 1, self._border('bottom', cx, cy)] &= ALL_WALLS ^ WALL_BITS[2]
+        walls[self._border('right', cx, cy), size - 1] &= ALL_WALLS ^ WALL_BITS[1]
+        return walls
+
+    def chunk(self, cx, cy):
+        """Wall array of chunk (cx, cy), generated on a cache miss."""
+        key = (cx, cy)
+        walls = self.chunks.get(key)
+        if walls is None:
+            walls = self.chunks[key] = self._generate(cx, cy)
+            self.generated += 1
+            if len(self.chunks) > self.cache_size:
+                self.chunks.popitem(last=False)  # Evict the least recently used chunk
+        else:
+            self.chunks.move_to_end(key)
+        return walls
+
+    def walls_at(self, x, y):
+        """Wall bits of cell (x, y)."""
+        cx, lx = divmod(x, self.size)
+        cy, ly = divmod(y, self.size)
+        return int(self.chunk(cx, cy)[lx, ly])
+
+    def has_wall(self, x, y, wall_idx):
+        """Check whether cell (x, y) has a wall in direction wall_idx."""
+        return bool(self.walls_at(x, y) & WALL_BITS[wall_idx])
+
+    def view(self, x, y, n, m):
+        """Copy of the n x m block of cells whose top-left cell is (x, y), as a MazeGrid."""
+        size = self.size
+        walls = np.empty((n, m), dtype=np.uint8)
+        for cx in range(x // size, (x + n - 1) // size + 1):
+            top, bottom = max(x, cx * size), min(x + n, (cx + 1) * size)
+            for cy in range(y // size, (y + m - 1) // size + 1):
+                left, right = max(y, cy * size), min(y + m, (cy + 1) * size)
+                walls[top - x:bottom - x, left - y:right - y] = \
+                    self.chunk(cx, cy)[top - cx * size:bottom - cx * size, left - cy * size:right - cy * size]
+        return MazeGrid(n, m, walls)
+
+    def __len__(self):
+        return len(self.chunks)
+
+
+class EndlessGame(MazeGame):
+    """MazeGame on a ChunkedMaze. There is no goal, so the game never ends."""
+
+    __slots__ = ('world',)
+
+    def __init__(self, world, start=(0, 0), heading=RIGHT):
+        self.world = world
+        self.grid = self.walls = None
+        self.m = None
+        self.start = start
+        self.start_heading = heading
+        self.goal_x = self.goal_y = None
+        self.reset()
+
+    def can_move(self, heading=None):
+        """Check whether there is no wall in front of the player (or in the given heading)."""
+        if heading is None:
+            heading = self.heading
+        return not self.world.walls_at(self.y, self.x) & WALL_BITS[heading]
+
+    def is_won(self):
+        """There is no goal to reach."""
+        return False
@@ -0,0 +1,65 @@
+from maze_grid import WALL_BITS
+
+# Headings, same values as maze.Dir
+UP, RIGHT, DOWN, LEFT = 0, 1, 2, 3
+
+# Estimated Maze Navigator command durations in seconds; maze.py starts from these and follows the
+# durations it measures on the robot
+FORWARD_TIME = 1.5
+TURN_TIME = 1.0
+
+
+class MazeGame:
+    """Headless maze game rules: position, heading, forward-only moves and win detection.
+
+    x is the column and y the row of the player's cell. Has no Qt or network dependency, so it can
+    be driven from tests, simulations and benchmarks as well as from MazeWindow.
+    """
+
+    __slots__ = ('grid', 'walls', 'm', 'x', 'y', 'heading', 'start', 'start_heading', 'goal_x', 'goal_y')
+
+    def __init__(self, grid, start=(0, 0), heading=RIGHT, goal=None):
+        self.grid = grid
+        self.walls = memoryview(grid.walls.reshape(-1))  # Shares the grid's wall bits, fast to index
+        self.m = grid.m
+        self.start = start
+        self.start_heading = heading
+        self.goal_x, self.goal_y = goal if goal is not None else (grid.m - 1, grid.n - 1)
+        self.reset()
+
+    def reset(self):
+        """Put the player back on the start cell."""
+        self.x, self.y = self.start
+        self.heading = self.start_heading
+
+    def can_move(self, heading=None):
+        """Check whether there is no wall in front of the player (or in the given heading)."""
+        if heading is None:
+            heading = self.heading
+        return not self.walls[self.y * self.m + self.x] & WALL_BITS[heading]
+
+    def move(self):
+        """Move one cell forward. Returns False if a wall is in the way or the game is already won."""
+        if self.is_won() or not self.can_move():
+            return False
+        heading = self.heading
+        if heading == UP:
+            self.y -= 1
+        elif heading == RIGHT:
+            self.x += 1
+        elif heading == DOWN:
+            self.y += 1
+        else:
+            self.x -= 1
+        return True
+
+    def rotate(self, direction):
+        """Rotate left (0) or right (1). Returns False if the direction is invalid or the game is won."""
+        if self.is_won() or direction not in (0, 1):
+            return False
+        self.heading = (self.heading + (1 if direction else -1)) % 4
+        return True
+
+    def is_won(self):
+        """Check whether the player has reached the goal."""
+        return self.x == self.goal_x and self.y == self.goal_y
@@ -0,0 +1,327 @@
+import numpy as np
+from PyQt5.QtWidgets import QOpenGLWidget
+from PyQt5.QtGui import QOpenGLContext, QOpenGLShader, QOpenGLShaderProgram, QOpenGLVersionProfile, QOffscreenSurface, QPainter, QVector2D
+from PyQt5.QtCore import QRect, pyqtSignal, Qt
+
+# OpenGL enums used below (PyQt5 doesn't export them)
+GL_TEXTURE_2D = 0x0DE1
+GL_TEXTURE0 = 0x84C0
+GL_TEXTURE_MIN_FILTER = 0x2801
+GL_TEXTURE_MAG_FILTER = 0x2800
+GL_TEXTURE_WRAP_S = 0x2802
+GL_TEXTURE_WRAP_T = 0x2803
+GL_NEAREST = 0x2600
+GL_CLAMP_TO_EDGE = 0x812F
+GL_LUMINANCE = 0x1909
+GL_UNSIGNED_BYTE = 0x1401
+GL_UNPACK_ALIGNMENT = 0x0CF5
+GL_MAX_TEXTURE_SIZE = 0x0D33
+GL_COLOR_BUFFER_BIT = 0x4000
+GL_TRIANGLE_STRIP = 0x0005
+GL_RENDERER = 0x1F01
+
+# The view widget sticks out of the maze view by the 2px border walls
+BORDER = 2
+
+VERTEX_SHADER = """
+attribute vec2 position;
+void main() {
+    gl_Position = vec4(position, 0.0, 1.0);
+}
+"""
+
+# One full-widget quad; every pixel works out its cell and looks the walls up in the wall texture.
+# Walls are 2 * pen pixels wide and centred on the cell edges, with square ends, like the QPainter tiles.
+FRAGMENT_SHADER = """
+#ifdef GL_ES
+precision highp float;
+#endif
+uniform sampler2D walls;    // Wall bits of each cell, one texel per cell
+uniform sampler2D visited;  // 255 for explored cells
+uniform vec2 cells;         // Columns and rows of the maze
+uniform vec2 origin;        // Pixel position of the top-left corner of cell (0, 0)
+uniform float height;       // Widget height, to turn gl_FragCoord upside down
+uniform float size;         // Pixels per cell
+uniform float pen;          // Half the wall width
+uniform vec4 view;          // Maze view (left, top, right, bottom)
+uniform vec4 clip;          // Maze view plus the border walls where the maze ends
+uniform float detail;       // 1 to draw walls, 0 to shade cells by their number of walls
+uniform float inset;        // Inset of the start and goal squares, negative to leave them out
+uniform float explored;     // 0 no overlay, 1 trail, 2 fog of war
+
+float bits(vec2 cell) {
+    if (cell.x < 0.0 || cell.y < 0.0 || cell.x >= cells.x || cell.y >= cells.y)
+        return 0.0;
+    return floor(texture2D(walls, (cell + 0.5) / cells).r * 255.0 + 0.5);
+}
+
+float bit(float value, float mask) {
+    return mod(floor(value / mask), 2.0);
+}
+
+bool horizontal(vec2 cell) {  // Wall along the top of cell
+    return bit(bits(cell), 1.0) + bit(bits(cell - vec2(0.0, 1.0)), 4.0) > 0.5;
+}
+
+bool vertical(vec2 cell) {  // Wall along the left of cell
+    return bit(bits(cell), 8.0) + bit(bits(cell - vec2(1.0, 0.0)), 2.0) > 0.5;
+}
+
+bool inside(vec2 p, vec4 rect) {
+    return p.x >= rect.x && p.y >= rect.y && p.x < rect.z && p.y < rect.w;
+}
+
+void main() {
+    vec2 p = vec2(gl_FragCoord.x, height - gl_FragCoord.y);
+    if (!inside(p, clip))
+        discard;
+    vec2 q = p - origin;
+    vec2 cell = floor(q / size);
+    vec2 local = q - cell * size;
+
+    bool wall = false;
+    if (detail > 0.5) {
+        vec2 line = floor(q / size + 0.5);  // Nearest lines between rows and between columns
+        if (abs(q.y - line.y * size) < pen) {
+            vec2 edge = vec2(cell.x, line.y);
+            wall = horizontal(edge) || (local.x < pen && horizontal(edge - vec2(1.0, 0.0)))
+                || (local.x >= size - pen && horizontal(edge + vec2(1.0, 0.0)));
+        }
+        if (!wall && abs(q.x - line.x * size) < pen) {
+            vec2 edge = vec2(line.x, cell.y);
+            wall = vertical(edge) || (local.y < pen && vertical(edge - vec2(0.0, 1.0)))
+                || (local.y >= size - pen && vertical(edge + vec2(0.0, 1.0)));
+        }
+    }
+    if (!inside(p, view)) {
+        if (!wall)
+            discard;
+        gl_FragColor = vec4(0.0, 0.0, 0.0, 1.0);
+        return;
+    }
+
+    vec3 color = vec3(255.0, 250.0, 245.0) / 255.0;
+    bool in_maze = cell.x >= 0.0 && cell.y >= 0.0 && cell.x < cells.x && cell.y < cells.y;
+    if (in_maze) {
+        if (inset >= 0.0 && local.x >= inset && local.y >= inset && local.x < size - inset && local.y < size - inset) {
+            if (cell == vec2(0.0, 0.0))
+                color = vec3(127.0, 255.0, 127.0) / 255.0;
+            else if (cell == cells - 1.0)
+                color = vec3(255.0, 127.0, 127.0) / 255.0;
+        }
+        if (detail < 0.5) {
+            float b = bits(cell);
+            color = vec3(255.0 - 40.0 * (bit(b, 1.0) + bit(b, 2.0) + bit(b, 4.0) + bit(b, 8.0))) / 255.0;
+        }
+    }
+    if (wall)
+        color = vec3(0.0);
+    if (in_maze && explored > 0.5) {
+        bool seen = texture2D(visited, (cell + 0.5) / cells).r > 0.5;
+        if (explored < 1.5) {
+            if (seen)
+                color = color * (1.0 - 60.0 / 255.0) + vec3(60.0, 47.0, 0.0) / 255.0;
+        } else if (!seen) {
+            color = vec3(60.0 / 255.0);
+        }
+    }
+    gl_FragColor = vec4(color, 1.0);
+}
+"""
+
+
+def opengl_available():
+    """Check whether an OpenGL 2.0 context can be created (a GPU driver or Mesa's llvmpipe will do)."""
+    context = QOpenGLContext()
+    if not context.create():
+        return False
+    surface = QOffscreenSurface()
+    surface.setFormat(context.format())
+    surface.create()
+    if not context.makeCurrent(surface):
+        return False
+    version = context.format().majorVersion(), context.format().minorVersion()
+    renderer = context.functions().glGetString(GL_RENDERER)
+    context.doneCurrent()
+    print(f"OpenGL {version[0]}.{version[1]} renderer: {renderer}")
+    return version >= (2, 0)
+
+
+class MazeGLView(QOpenGLWidget):
+    """OpenGL view of a MazeWindow's maze, laid over the maze area of the window.
+
+    The walls and the explored cells live in two textures with one texel per cell, uploaded once
+    per maze. A fragment shader draws the walls from them at any zoom and scroll position, so
+    moving, zooming and scrolling only change a few uniforms, and a step or a wall shift only
+    uploads the texels that changed. The labels and the player are drawn on top with QPainter.
+    Only OpenGL 2.0 is needed, so it also runs on Mesa's software rasterizer.
+    """
+
+    failed = pyqtSignal(str)  # Emitted if the maze can't be drawn with OpenGL
+
+    def __init__(self, window, line_detail_cell):
+        super().__init__(window)
+        self.maze_window = window
+        self.line_detail_cell = line_detail_cell  # Fewest pixels per cell at which walls are drawn
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)  # Dragging and zooming are handled by the window
+        self.gl = self.program = None
+        self.textures = None  # Wall and visited texture ids
+        self.grid = self.visited = None  # Arrays in the textures, to notice a new maze
+        self.changed_walls = set()  # (x, y) cells whose walls changed since the last upload
+        self.changed_visited = set()  # (x, y) cells explored since the last upload
+        self.max_texture_size = 0
+
+    def place(self):
+        """Cover the maze view of the window, plus room for the border walls."""
+        size = self.maze_window.maze_size
+        self.setGeometry(50 - BORDER, 50 - BORDER, size + 2 * BORDER, size + 2 * BORDER)
+
+    def initializeGL(self):
+        profile = QOpenGLVersionProfile()
+        profile.setVersion(2, 0)
+        self.gl = self.context().versionFunctions(profile)
+        if self.gl is None:
+            self.failed.emit("OpenGL 2.0 functions are not available")
+            return
+        self.gl.initializeOpenGLFunctions()
+
+        program = QOpenGLShaderProgram(self)
+        if not (program.addShaderFromSourceCode(QOpenGLShader.Vertex, VERTEX_SHADER)
+                and program.addShaderFromSourceCode(QOpenGLShader.Fragment, FRAGMENT_SHADER)
+                and program.link()):
+            self.failed.emit(f"Maze shader failed to build: {program.log()}")
+            return
+        self.program = program
+        self.textures = self.gl.glGenTextures(2)
+        for texture in self.textures:
+            self.gl.glBindTexture(GL_TEXTURE_2D, texture)
+            for name, value in ((GL_TEXTURE_MIN_FILTER, GL_NEAREST), (GL_TEXTURE_MAG_FILTER, GL_NEAREST),
+                                (GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE), (GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)):
+                self.gl.glTexParameteri(GL_TEXTURE_2D, name, value)
+        self.gl.glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        self.max_texture_size = self.gl.glGetIntegerv(GL_MAX_TEXTURE_SIZE)
+
+    def update_walls(self, changed):
+        """Walls changed in place; changed holds (x, y, wall_idx) entries as made by MazeShifter."""
+        self.changed_walls.update((x, y) for x, y, _ in changed)
+        self.update()
+
+    def visit(self, x, y):
+        """Cell (x, y) (row, column) was explored."""
+        self.changed_visited.add((x, y))
+
+    def reload(self):
+        """Upload the whole maze again on the next paint, after it changed in place."""
+        self.grid = self.visited = None
+        self.update()
+
+    def upload(self, texture, pixels):
+        self.gl.glBindTexture(GL_TEXTURE_2D, texture)
+        self.gl.glTexImage2D(GL_TEXTURE_2D, 0, GL_LUMINANCE, pixels.shape[1], pixels.shape[0], 0,
+                             GL_LUMINANCE, GL_UNSIGNED_BYTE, np.ascontiguousarray(pixels).tobytes())
+
+    def upload_cells(self, texture, cells, values):
+        self.gl.glBindTexture(GL_TEXTURE_2D, texture)
+        for (x, y), value in zip(cells, values):
+            self.gl.glTexSubImage2D(GL_TEXTURE_2D, 0, y, x, 1, 1, GL_LUMINANCE, GL_UNSIGNED_BYTE, bytes((value,)))
+
+    def sync_textures(self):
+        """Bring the textures up to date with the window's maze. Returns False if it doesn't fit."""
+        window = self.maze_window
+        grid = window.maze
+        if self.grid is not grid:
+            if max(grid.n, grid.m) > self.max_texture_size:
+                self.failed.emit(f"A {grid.n}x{grid.m} maze is larger than the {self.max_texture_size} texel OpenGL limit")
+                return False
+            self.upload(self.textures[0], grid.walls)
+            self.grid = grid
+            self.changed_walls.clear()
+        elif self.changed_walls:
+            self.upload_cells(self.textures[0], self.changed_walls, [int(grid.walls[x, y]) for x, y in self.changed_walls])
+            self.changed_walls.clear()
+
+        visited = window.visited
+        if visited is not None:
+            if self.visited is not visited:
+                self.upload(self.textures[1], visited.view(np.uint8) * 255)
+                self.visited = visited
+                self.changed_visited.clear()
+            elif self.changed_visited:
+                self.upload_cells(self.textures[1], self.changed_visited, [255] * len(self.changed_visited))
+                self.changed_visited.clear()
+        return True
+
+    def draw_walls(self):
+        """Draw the maze background, start and goal, walls and explored cells with the shader."""
+        window = self.maze_window
+        gl, program = self.gl, self.program
+        ratio = self.devicePixelRatioF()
+        left = 50 - BORDER  # Window position of the widget
+        grid = window.maze
+        size = window.cell_size
+
+        # Same clip area as MazeWindow.draw_maze, in device pixels of this widget
+        view = QRect(50, 50, window.maze_size, window.maze_size)
+        if window.world is not None:
+            clip = view
+        else:
+            clip = view.adjusted(-BORDER if window.scroll_x == 0 else 0, -BORDER if window.scroll_y == 0 else 0,
+                                 BORDER if window.scroll_x + window.maze_size >= window.m * size else 0,
+                                 BORDER if window.scroll_y + window.maze_size >= window.n * size else 0)
+        origin_x, origin_y = window.origin()
+
+        program.bind()
+        program.setUniformValue("walls", 0)
+        program.setUniformValue("visited", 1)
+        program.setUniformValue("cells", float(grid.m), float(grid.n))
+        program.setUniformValue("origin", (origin_x - left) * ratio, (origin_y - left) * ratio)
+        program.setUniformValue("height", float(self.height() * ratio))
+        program.setUniformValue("size", float(size * ratio))
+        program.setUniformValue("pen", float(ratio))
+        for name, rect in (("view", view), ("clip", clip)):
+            program.setUniformValue(name, (rect.left() - left) * ratio, (rect.top() - left) * ratio,
+                                    (rect.right() + 1 - left) * ratio, (rect.bottom() + 1 - left) * ratio)
+        program.setUniformValue("detail", 1.0 if size >= self.line_detail_cell else 0.0)
+        program.setUniformValue("inset", float(min(15, size // 4) * ratio) if window.world is None else -1.0)
+        explored = 0.0 if window.visited is None else 2.0 if window.fog_of_war else 1.0
+        program.setUniformValue("explored", explored)
+
+        gl.glActiveTexture(GL_TEXTURE0)
+        gl.glBindTexture(GL_TEXTURE_2D, self.textures[0])
+        gl.glActiveTexture(GL_TEXTURE0 + 1)
+        gl.glBindTexture(GL_TEXTURE_2D, self.textures[1])
+        gl.glActiveTexture(GL_TEXTURE0)
+
+        position = program.attributeLocation("position")
+        program.enableAttributeArray(position)
+        program.setAttributeArray(position, [QVector2D(-1, -1), QVector2D(1, -1), QVector2D(-1, 1), QVector2D(1, 1)])
+        gl.glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        program.disableAttributeArray(position)
+        program.release()
+
+    def paintGL(self):
+        if self.gl is None:
+            return
+        window = self.maze_window
+        painter = QPainter(self)
+        painter.beginNativePainting()
+        self.gl.glClearColor(250 / 255, 235 / 255, 215 / 255, 1.0)  # antiquewhite, the window background
+        self.gl.glClear(GL_COLOR_BUFFER_BIT)
+        ready = self.program is not None and window.game_started and self.sync_textures()
+        if ready:
+            self.draw_walls()
+        painter.endNativePainting()
+
+        # Everything else is drawn in window coordinates by the window itself
+        painter.translate(BORDER - 50, BORDER - 50)
+        if not window.game_started:
+            window.draw_begin_screen(painter)
+        elif ready:
+            if not window.fog_of_war:  # Under fog of war the labels would give the unexplored goal away
+                painter.save()
+                painter.setClipRect(QRect(50, 50, window.maze_size, window.maze_size))
+                painter.translate(*window.origin())
+                window.draw_labels(painter)
+                painter.restore()
+            window.draw_overlays(painter)
+        painter.end()
@@ -0,0 +1,141 @@
+import heapq
+import numpy as np
+from maze_grid import WALL_BITS
+from maze_solver import OPEN_COUNT, open_mask, _steps
+
+# Turns needed for a heading change of 0, +90, 180 and -90 degrees
+TURN_COUNT = (0, 1, 2, 1)
+
+
+class CorridorGraph:
+    """Maze compressed to a graph of junctions, dead ends and kept cells, joined by corridors.
+
+    Every cell with exactly two openings is folded into the corridor edge that runs through it.
+    Each directed edge stores (target node, exit heading, arrival heading, length, turns): the
+    heading the robot leaves on, the heading it arrives with, the number of forward moves and the
+    number of turns inside the corridor. Planning then scales with the number of junctions.
+    """
+
+    def __init__(self, grid, keep=()):
+        self.grid = grid
+        self.m = grid.m
+        self.walls = grid.walls.tobytes()
+        self.steps = _steps(grid.m)
+
+        is_node = OPEN_COUNT[open_mask(grid)] != 2
+        for x, y in keep:
+            is_node[x, y] = True
+        self.is_node = is_node.reshape(-1)
+        self.nodes = np.flatnonzero(self.is_node)
+        self.edges = {}  # node cell -> [(target cell, exit heading, arrival heading, length, turns)]
+
+        done = set()  # (node, exit heading) pairs already covered by a traced corridor
+        for node in self.nodes.tolist():
+            for heading in range(4):
+                if self.walls[node] & WALL_BITS[heading] or (node, heading) in done:
+                    continue
+                target, arrival, length, turns = self._trace(node, heading)
+                self.edges.setdefault(node, []).append((target, heading, arrival, length, turns))
+
+                # The same corridor walked backwards from the other end
+                reverse = (target, (arrival + 2) % 4)
+                if reverse != (node, heading):
+                    self.edges.setdefault(target, []).append((node, reverse[1], (heading + 2) % 4, length, turns))
+                    done.add(reverse)
+        self.edge_count = sum(len(edges) for edges in self.edges.values()) // 2
+
+    def _trace(self, cell, heading, path=None):
+        """Walk from cell in heading along the corridor until the next node.
+
+        Returns (node, arrival heading, length, turns). Appends the commands to path if given.
+        """
+        walls, steps, is_node = self.walls, self.steps, self.is_node
+        length = turns = 0
+        while True:
+            cell += steps[heading]
+            length += 1
+            if length > len(is_node):
+                raise ValueError("Corridor loops without reaching a junction")
+            if path is not None:
+                path.append("forward")
+            if is_node[cell]:
+                return cell, heading, length, turns
+
+            # A corridor cell has one other opening besides the one we came in through
+            back = (heading + 2) % 4
+            bits = walls[cell]
+            for out in (heading, (heading + 1) % 4, (heading + 3) % 4):
+                if out != back and not bits & WALL_BITS[out]:
+                    break
+            if out != heading:
+                turns += 1
+                if path is not None:
+                    path.append("right" if out == (heading + 1) % 4 else "left")
+                heading = out
+
+    @staticmethod
+    def _turns_between(heading, target):
+        """Commands needed to turn from heading to target."""
+        delta = (target - heading) % 4
+        return {0: [], 1: ["right"], 2: ["right", "right"], 3: ["left"]}[delta]
+
+    def plan(self, start, heading, goal, forward_time=1.0, turn_time=1.0):
+        """Fastest command sequence from start (x, y) facing heading to goal, planned on the graph.
+
+        goal must be a node (pass it in keep). start may be any cell; from a corridor cell the
+        search starts by walking to the nodes at either end. Returns (commands, total_time), or None
+        if the goal can't be reached.
+        """
+        m = self.m
+        source = start[0] * m + start[1]
+        target = goal[0] * m + goal[1]
+        if not self.is_node[target]:
+            raise ValueError("Goal must be a node of the corridor graph")
+
+        # Edges out of the start cell, traced on the fly if it sits inside a corridor
+        if self.is_node[source]:
+            first_edges = self.edges.get(source, [])
+        else:
+            first_edges = []
+            for out in range(4):
+                if not self.walls[source] & WALL_BITS[out]:
+                    try:
+                        node, arrival, length, turns = self._trace(source, out)
+                    except ValueError:
+                        return None  # A loop of corridor cells with no node on it, so not the goal either
+                    first_edges.append((node, out, arrival, length, turns))
+
+        # Dijkstra over (node, heading) states; the start is a pseudo-state with no incoming edge
+        best = {(source, heading): 0.0}
+        came_from = {}  # state -> (previous state, exit heading)
+        heap = [(0.0, source, heading)]
+        while heap:
+            cost, cell, facing = heapq.heappop(heap)
+            if cost > best[(cell, facing)]:
+                continue  # Stale heap entry
+            if cell == target:
+                return self._commands(came_from, (source, heading), (cell, facing)), cost
+
+            edges = first_edges if cell == source else self.edges.get(cell, [])
+            for node, out, arrival, length, turns in edges:
+                step_cost = (TURN_COUNT[(out - facing) % 4] + turns) * turn_time + length * forward_time
+                state = (node, arrival)
+                if cost + step_cost < best.get(state, float('inf')):
+                    best[state] = cost + step_cost
+                    came_from[state] = ((cell, facing), out)
+                    heapq.heappush(heap, (cost + step_cost, node, arrival))
+        return None
+
+    def _commands(self, came_from, source_state, state):
+        """Expand the chosen corridor edges back into robot commands."""
+        legs = []
+        while state != source_state:
+            previous, out = came_from[state]
+            legs.append((previous, out))
+            state = previous
+
+        commands = []
+        for (cell, facing), out in reversed(legs):
+            commands.extend(self._turns_between(facing, out))
+            self._trace(cell, out, commands)
+        return commands
@@ -0,0 +1,396 @@
+from array import array
+import sys
+import random
+import time
+import numpy as np
+
+# Wall bits for each cell, indexed by direction [Top, Right, Bottom, Left]
+WALL_BITS = (1, 2, 4, 8)
+ALL_WALLS = 0b1111
+
+# Row/column step for each direction [Top, Right, Bottom, Left]
+DIRECTIONS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+class MazeGrid:
+    """N x M maze stored as one packed uint8 wall bitmask per cell.
+
+    walls[x][y] holds the walls of row x, column y. Bit (1 << d) is set while
+    the wall in direction d (0 = Top, 1 = Right, 2 = Bottom, 3 = Left) is up.
+    """
+
+    def __init__(self, n, m, walls=None):
+        self.n, self.m = n, m
+        if walls is None:
+            walls = np.full((n, m), ALL_WALLS, dtype=np.uint8)
+        self.walls = walls
+        self.algorithm = None  # Name of the generator that built this maze
+        self.seed = None  # Seed the maze was generated from, if any
+        self.generation_time = None  # Seconds spent generating, set by generate_maze
+
+    def has_wall(self, x, y, wall_idx):
+        """Check whether cell (x, y) has a wall in direction wall_idx."""
+        return bool(self.walls[x, y] & WALL_BITS[wall_idx])
+
+    def remove_wall(self, x, y, wall_idx):
+        """Remove the wall of (x, y) in direction wall_idx, on both sides."""
+        dx, dy = DIRECTIONS[wall_idx]
+        self.walls[x, y] &= ~WALL_BITS[wall_idx] & ALL_WALLS
+        self.walls[x + dx, y + dy] &= ~WALL_BITS[(wall_idx + 2) % 4] & ALL_WALLS
+
+    def add_wall(self, x, y, wall_idx):
+        """Put up the wall of (x, y) in direction wall_idx, on both sides."""
+        dx, dy = DIRECTIONS[wall_idx]
+        self.walls[x, y] |= WALL_BITS[wall_idx]
+        self.walls[x + dx, y + dy] |= WALL_BITS[(wall_idx + 2) % 4]
+
+    # Compatibility accessor: maze[x][y]['walls'][d] works like the old list-of-dicts maze
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, x):
+        return _MazeRow(self.walls[x])
+
+
+class _MazeRow:
+    """One row of a MazeGrid, indexable by column."""
+
+    __slots__ = ('row',)
+
+    def __init__(self, row):
+        self.row = row
+
+    def __len__(self):
+        return len(self.row)
+
+    def __getitem__(self, y):
+        bits = int(self.row[y])
+        return {'walls': [bool(bits & bit) for bit in WALL_BITS]}
+
+
+def _numpy_rng(rng):
+    """Derive a numpy Generator from a random.Random-style source."""
+    return np.random.default_rng(rng.getrandbits(64))
+
+
+def _grid_from_bytes(n, m, walls):
+    """Wrap a flat row-major bytearray of wall bits into a MazeGrid."""
+    return MazeGrid(n, m, np.frombuffer(walls, dtype=np.uint8).reshape(n, m))
+
+
+def _neighbours(cell, n, m):
+    """List (wall_idx, neighbour) pairs of a flat cell index that lie inside the grid."""
+    y = cell % m
+    result = []
+    if cell >= m:
+        result.append((0, cell - m))
+    if y < m - 1:
+        result.append((1, cell + 1))
+    if cell < (n - 1) * m:
+        result.append((2, cell + m))
+    if y > 0:
+        result.append((3, cell - 1))
+    return result
+
+
+def _carve(walls, cell, nxt, wall_idx):
+    """Remove the wall between flat cells cell and nxt (in direction wall_idx from cell)."""
+    walls[cell] &= ~WALL_BITS[wall_idx]
+    walls[nxt] &= ~WALL_BITS[(wall_idx + 2) % 4]
+
+
+def generate_backtracking(n, m, rng=random):
+    """Generates an N x M maze using iterative backtracking with an explicit stack."""
+    walls = bytearray(b'\x0f' * (n * m))  # Flat row-major wall bits, much faster to index than numpy scalars
+    stack = array('l', [0])  # Start at the top-left corner
+    rand = rng.random
+    last_row = (n - 1) * m
+
+    # A cell is unvisited while all 4 of its walls are still up (the start cell is left first)
+    while stack:
+        cell = stack[-1]
+        y = cell % m
+        options = []
+        if cell >= m and walls[cell - m] == ALL_WALLS:
+            options.append(0)
+        if y < m - 1 and walls[cell + 1] == ALL_WALLS:
+            options.append(1)
+        if cell < last_row and walls[cell + m] == ALL_WALLS:
+            options.append(2)
+        if y > 0 and walls[cell - 1] == ALL_WALLS:
+            options.append(3)
+
+        if not options:
+            stack.pop()
+            continue
+
+        wall_idx = options[int(rand() * len(options))]
+        if wall_idx == 0:
+            nxt = cell - m
+        elif wall_idx == 1:
+            nxt = cell + 1
+        elif wall_idx == 2:
+            nxt = cell + m
+        else:
+            nxt = cell - 1
+        _carve(walls, cell, nxt, wall_idx)
+        stack.append(nxt)
+
+    return _grid_from_bytes(n, m, walls)
+
+
+def generate_kruskal(n, m, rng=random):
+    """Generates an N x M maze using randomized Kruskal with a union-find."""
+    walls = bytearray(b'\x0f' * (n * m))
+    cells = np.arange(n * m, dtype=np.int64).reshape(n, m)
+
+    # Edge e joins cell e >> 1 to its right (e & 1 == 0) or bottom (e & 1 == 1) neighbour
+    edges = np.concatenate((cells[:, :-1].ravel() * 2, cells[:-1, :].ravel() * 2 + 1))
+    _numpy_rng(rng).shuffle(edges)
+
+    parent = array('l', range(n * m))
+    remaining = n * m - 1
+    for edge in edges.tolist():
+        if not remaining:
+            break
+        cell = edge >> 1
+        if edge & 1:
+            nxt, wall_idx = cell + m, 2
+        else:
+            nxt, wall_idx = cell + 1, 1
+
+        # Find both roots with path halving
+        a = cell
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        b = nxt
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue  # Already connected, keep the wall
+
+        parent[a] = b
+        _carve(walls, cell, nxt, wall_idx)
+        remaining -= 1
+
+    return _grid_from_bytes(n, m, walls)
+
+
+def generate_prim(n, m, rng=random):
+    """Generates an N x M maze using randomized Prim."""
+    walls = bytearray(b'\x0f' * (n * m))
+    state = bytearray(n * m)  # 0 = untouched, 1 = frontier, 2 = in maze
+    frontier = array('l')
+    rand = rng.random
+
+    def add_to_maze(cell):
+        state[cell] = 2
+        for _, nxt in _neighbours(cell, n, m):
+            if not state[nxt]:
+                state[nxt] = 1
+                frontier.append(nxt)
+
+    add_to_maze(0)
+    while frontier:
+        # Pop a random frontier cell (swap with the last one to keep it O(1))
+        i = int(rand() * len(frontier))
+        cell = frontier[i]
+        frontier[i] = frontier[-1]
+        frontier.pop()
+
+        options = [(wall_idx, nxt) for wall_idx, nxt in _neighbours(cell, n, m) if state[nxt] == 2]
+        wall_idx, nxt = options[int(rand() * len(options))]
+        _carve(walls, cell, nxt, wall_idx)
+        add_to_maze(cell)
+
+    return _grid_from_bytes(n, m, walls)
+
+
+def generate_wilson(n, m, rng=random):
+    """Generates an N x M maze using Wilson's loop-erased random walk (uniform spanning tree)."""
+    walls = bytearray(b'\x0f' * (n * m))
+    in_maze = bytearray(n * m)
+    exits = bytearray(n * m)  # Last direction taken out of each cell during the current walk
+    rand = rng.random
+
+    in_maze[int(rand() * n * m)] = 1
+    for start in range(n * m):
+        if in_maze[start]:
+            continue
+
+        # Random walk until the maze is hit; overwriting exits erases any loops
+        cell = start
+        while not in_maze[cell]:
+            options = _neighbours(cell, n, m)
+            wall_idx, nxt = options[int(rand() * len(options))]
+            exits[cell] = wall_idx
+            cell = nxt
+
+        # Carve the loop-erased path
+        cell = start
+        while not in_maze[cell]:
+            wall_idx = exits[cell]
+            nxt = cell + (-m, 1, m, -1)[wall_idx]
+            _carve(walls, cell, nxt, wall_idx)
+            in_maze[cell] = 1
+            cell = nxt
+
+    return _grid_from_bytes(n, m, walls)
+
+
+def generate_binary_tree(n, m, rng=random):
+    """Generates an N x M maze by carving each cell up or left at random (vectorized)."""
+    grid = MazeGrid(n, m)
+    walls = grid.walls
+
+    up = _numpy_rng(rng).random((n, m)) < 0.5
+    up[0, :] = False  # Top row can only carve left
+    up[:, 0] = True  # Left column can only carve up
+    up[0, 0] = False
+    left = ~up
+    left[0, 0] = False
+
+    walls[up] &= ALL_WALLS ^ WALL_BITS[0]
+    walls[:-1][up[1:]] &= ALL_WALLS ^ WALL_BITS[2]
+    walls[left] &= ALL_WALLS ^ WALL_BITS[3]
+    walls[:, :-1][left[:, 1:]] &= ALL_WALLS ^ WALL_BITS[1]
+    return grid
+
+
+def generate_sidewinder(n, m, rng=random):
+    """Generates an N x M maze using the sidewinder algorithm (vectorized)."""
+    grid = MazeGrid(n, m)
+    walls = grid.walls
+    np_rng = _numpy_rng(rng)
+
+    # Carve right within runs; the top row is one long corridor
+    right = np_rng.random((n, m)) < 0.5
+    right[0, :] = True
+    right[:, -1] = False
+    walls[right] &= ALL_WALLS ^ WALL_BITS[1]
+    walls[:, 1:][right[:, :-1]] &= ALL_WALLS ^ WALL_BITS[3]
+
+    if n > 1:
+        # Each run below the top row ends where it stops carving right, and opens up from one random member
+        ends = np.flatnonzero(~right[1:].ravel())
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        picks = starts + (np_rng.random(len(starts)) * (ends - starts + 1)).astype(np.int64) + m
+        flat = walls.reshape(-1)
+        flat[picks] &= ALL_WALLS ^ WALL_BITS[0]
+        flat[picks - m] &= ALL_WALLS ^ WALL_BITS[2]
+    return grid
+
+
+def generate_eller_rows(n, m, rng=random):
+    """Yields an N x M maze one row of wall bits at a time using Eller's algorithm.
+
+    Only the current row's set labels are kept, so memory is O(M) however many rows are generated.
+    """
+    rand = rng.random
+    labels = list(range(m))  # Set label of each cell in the current row
+    members = {label: [y] for y, label in enumerate(labels)}  # Columns in each set
+    next_label = m
+    open_top = [False] * m  # Cells connected to the row above
+
+    for x in range(n):
+        last_row = x == n - 1
+        row = bytearray(b'\x0f' * m)
+        for y in range(m):
+            if open_top[y]:
+                row[y] &= ALL_WALLS ^ WALL_BITS[0]
+
+        # Randomly join adjacent cells in different sets (the last row joins all of them)
+        for y in range(m - 1):
+            a, b = labels[y], labels[y + 1]
+            if a != b and (last_row or rand() < 0.5):
+                if len(members[a]) < len(members[b]):
+                    a, b = b, a
+                for k in members[b]:
+                    labels[k] = a
+                members[a].extend(members.pop(b))
+                row[y] &= ALL_WALLS ^ WALL_BITS[1]
+                row[y + 1] &= ALL_WALLS ^ WALL_BITS[3]
+
+        if last_row:
+            yield np.frombuffer(row, dtype=np.uint8)
+            return
+
+        # Every set opens down at least once; cells that don't start new sets in the next row
+        open_top = [False] * m
+        for columns in members.values():
+            down = [y for y in columns if rand() < 0.5] or [columns[int(rand() * len(columns))]]
+            for y in down:
+                open_top[y] = True
+                row[y] &= ALL_WALLS ^ WALL_BITS[2]
+        yield np.frombuffer(row, dtype=np.uint8)
+
+        members = {}
+        for y in range(m):
+            if not open_top[y]:
+                labels[y] = next_label
+                next_label += 1
+            members.setdefault(labels[y], []).append(y)
+
+
+def generate_eller(n, m, rng=random):
+    """Generates an N x M maze using Eller's algorithm."""
+    grid = MazeGrid(n, m)
+    for x, row in enumerate(generate_eller_rows(n, m, rng)):
+        grid.walls[x] = row
+    return grid
+
+
+def write_maze_rows(rows, f):
+    """Stream maze rows (e.g. from generate_eller_rows) into a binary file, one byte per cell.
+
+    Returns the number of rows written.
+    """
+    count = 0
+    for row in rows:
+        f.write(row.tobytes())
+        count += 1
+    return count
+
+
+# Maze generators selectable by name
+GENERATORS = {
+    'backtracking': generate_backtracking,
+    'kruskal': generate_kruskal,
+    'prim': generate_prim,
+    'wilson': generate_wilson,
+    'binary_tree': generate_binary_tree,
+    'sidewinder': generate_sidewinder,
+    'eller': generate_eller,
+}
+
+
+def seeded_rng(n, m, seed, algorithm):
+    """Random source keyed by (n, m, seed, algorithm), so the same key always gives the same maze."""
+    return random.Random(f"{algorithm}:{n}x{m}:{seed}")
+
+
+# Maze generation function
+def generate_maze(n, m, algorithm='backtracking', rng=random, seed=None):
+    """Generates an N x M maze with the named algorithm and records how long it took.
+
+    If a seed is given the maze is deterministic and rng is ignored.
+    """
+    if seed is not None:
+        rng = seeded_rng(n, m, seed, algorithm)
+    start_time = time.perf_counter()
+    grid = GENERATORS[algorithm](n, m, rng)
+    grid.algorithm = algorithm
+    grid.seed = seed
+    grid.generation_time = time.perf_counter() - start_time
+    return grid
+
+
+# Time every generator, e.g. `python maze_grid.py 100 500 1000`
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 500]
+    for size in sizes:
+        for name in GENERATORS:
+            grid = generate_maze(size, size, name)
+            print(f"{size}x{size} {name}: {grid.generation_time:.3f}s")
@@ -0,0 +1,124 @@
+import bisect
+import time
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+# Shortest time in seconds between two commands from the same source; faster ones are dropped.
+# Keyboard auto-repeat and D-pad clicks are throttled to what the Maze Navigator can follow, the
+# Controller debounces its buttons itself, and every recognised voice command is deliberate.
+MIN_INTERVALS = {
+    'keyboard': 0.3,
+    'dpad': 0.3,
+    'controller': 0.1,
+    'voice': 0.0,
+}
+
+
+class InputEvent:
+    """A player command, stamped with its source and the time it was read there.
+
+    done(handled), if given, is called on the GUI thread once the command was handled (True) or
+    dropped by the rate limit (False).
+    """
+
+    __slots__ = ('source', 'command', 'time', 'done')
+
+    def __init__(self, source, command, done=None):
+        self.source = source
+        self.command = command
+        self.time = time.perf_counter()
+        self.done = done
+
+
+class LatencyHistogram:
+    """Counts of latencies in fixed, roughly logarithmic buckets (upper bounds in milliseconds)."""
+
+    BOUNDS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # The last bucket holds everything slower
+        self.total = 0
+        self.largest = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BOUNDS, ms)] += 1
+        self.total += 1
+        self.largest = max(self.largest, ms)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, in milliseconds (None when empty)."""
+        if not self.total:
+            return None
+        rank = p / 100 * self.total
+        seen = 0
+        for bound, count in zip(self.BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.largest)
+        return self.largest
+
+    def summary(self):
+        if not self.total:
+            return "no events"
+        return f"{self.total} events, p50 <= {self.percentile(50):.1f} ms, p99 <= {self.percentile(99):.1f} ms, max {self.largest:.1f} ms"
+
+
+class InputBus(QObject):
+    """Delivers player commands from any thread to the GUI thread, one at a time and in order.
+
+    post() may be called from any thread (keyboard, D-pad, Controller link, voice listener). The
+    event is queued to the thread the bus lives on, where commands arriving faster than their
+    source's minimum interval are dropped and the rest go to handler(event). Latencies from the
+    source to dispatch, and to the command being sent to the robot (robot_sent, called while the
+    handler runs), are kept per source.
+    """
+
+    posted = pyqtSignal(object)
+
+    def __init__(self, handler, min_intervals=MIN_INTERVALS):
+        super().__init__()
+        self.handler = handler
+        self.min_intervals = dict(min_intervals)
+        self.last_times = {}  # Source -> time of its last dispatched event
+        self.dropped = {}  # Source -> number of rate limited events
+        self.dispatch_latency = {}  # Source -> LatencyHistogram from input to dispatch
+        self.robot_latency = {}  # Source -> LatencyHistogram from input to sending the robot command
+        self.current = None  # Event being handled
+        self.posted.connect(self._dispatch, Qt.QueuedConnection)
+
+    def post(self, source, command, done=None):
+        """Queue a command from source. Thread-safe."""
+        self.posted.emit(InputEvent(source, command, done))
+
+    def _dispatch(self, event):
+        last_time = self.last_times.get(event.source)
+        if last_time is not None and event.time - last_time < self.min_intervals.get(event.source, 0.0):
+            self.dropped[event.source] = self.dropped.get(event.source, 0) + 1
+            if event.done:
+                event.done(False)
+            return
+        self.last_times[event.source] = event.time
+        self.dispatch_latency.setdefault(event.source, LatencyHistogram()).add(time.perf_counter() - event.time)
+        self.current = event
+        try:
+            self.handler(event)
+        finally:
+            self.current = None
+        if event.done:
+            event.done(True)
+
+    def robot_sent(self):
+        """Note that the event being handled has reached the robot link."""
+        if self.current is not None:
+            self.robot_latency.setdefault(self.current.source, LatencyHistogram()).add(time.perf_counter() - self.current.time)
+
+    def report(self):
+        """Latency summary per source, one line each."""
+        lines = []
+        for source in sorted(self.dispatch_latency):
+            lines.append(f"{source}: to dispatch {self.dispatch_latency[source].summary()}")
+            if source in self.robot_latency:
+                lines.append(f"{source}: to robot {self.robot_latency[source].summary()}")
+            if self.dropped.get(source):
+                lines.append(f"{source}: {self.dropped[source]} rate limited")
+        return lines
@@ -0,0 +1,175 @@
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+from maze_grid import MazeGrid, generate_maze
+
+# File layout:
+#   header  magic, version, reserved, entry count, index offset
+#   data    one packed wall blob per maze, 4 wall bits per cell (2 cells per byte)
+#   index   one entry per maze: n, m, seed, algorithm, data offset
+# Every add appends the new maze's data and a new index at the end of the file and only then points
+# the header at the new index, so an add that is interrupted leaves the previous library readable.
+# The superseded indexes are dropped, along with the oldest mazes once the library holds max_entries,
+# by compacting into a new file that replaces the old one.
+MAGIC = b'MAZE'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+ENTRY = struct.Struct('<IIq16sQ')
+MAX_SEED = 2**63 - 1  # Largest seed an index entry can hold
+
+
+def pack_walls(walls):
+    """Pack an (n, m) uint8 wall grid into 4 bits per cell."""
+    flat = walls.reshape(-1)
+    if flat.size % 2:
+        flat = np.append(flat, np.uint8(0))
+    return (flat[0::2] & 0x0F) | (flat[1::2] << 4)
+
+
+def unpack_walls(packed, n, m):
+    """Unpack 4-bit wall data back into an (n, m) uint8 wall grid."""
+    flat = np.empty(packed.size * 2, dtype=np.uint8)
+    flat[0::2] = packed & 0x0F
+    flat[1::2] = packed >> 4
+    return flat[:n * m].reshape(n, m)
+
+
+class MazeLibrary:
+    """Library of generated mazes keyed by (n, m, seed, algorithm), loaded through mmap.
+
+    Safe to share between the GUI thread and the prefetch thread.
+    """
+
+    def __init__(self, path, max_entries=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.index = {}  # (n, m, seed, algorithm) -> data offset
+        self.index_offset = HEADER.size
+        self.map = None
+
+        if not os.path.exists(path):
+            self._write({}, [])
+        try:
+            self._open()
+        except (OSError, ValueError, struct.error) as e:
+            # Keep the unreadable file for inspection, but don't let it stop the game from starting
+            self.close()
+            print(f"Could not read maze library {path} ({e}), moving it to {path}.bad and starting an empty one")
+            os.replace(path, path + '.bad')
+            self._write({}, [])
+            self._open()
+
+    def _open(self):
+        """Map the library file and read its index."""
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, self.index_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} maze library")
+
+        self.index = {}
+        for i in range(count):
+            n, m, seed, algorithm, offset = ENTRY.unpack_from(self.map, self.index_offset + i * ENTRY.size)
+            if offset + (n * m + 1) // 2 > len(self.map):
+                raise ValueError(f"{self.path} has an index entry past the end of the file")
+            self.index[(n, m, seed, algorithm.rstrip(b'\0').decode())] = offset
+
+    def _write(self, index, blobs):
+        """Replace the library file with one holding blobs, the wall data of the mazes in index order.
+
+        The file is written beside the library and renamed over it, so it is either all old or all new.
+        """
+        temp = self.path + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(index), 0))
+            offsets = []
+            for blob in blobs:
+                offsets.append(f.tell())
+                f.write(blob)
+            index_offset = f.tell()
+            for (n, m, seed, algorithm), offset in zip(index, offsets):
+                f.write(ENTRY.pack(n, m, seed, algorithm.encode(), offset))
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(index), index_offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+
+    def close(self):
+        """Unmap the library file."""
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def load(self, n, m, seed, algorithm):
+        """Load a stored maze, or return None if it isn't in the library."""
+        with self.lock:
+            offset = self.index.get((n, m, seed, algorithm))
+            if offset is None:
+                return None
+            packed = np.frombuffer(self.map, dtype=np.uint8, count=(n * m + 1) // 2, offset=offset)
+            walls = unpack_walls(packed, n, m)
+            del packed  # Release the mmap buffer so the map can be closed later
+
+        grid = MazeGrid(n, m, walls)
+        grid.algorithm = algorithm
+        grid.seed = seed
+        return grid
+
+    def add(self, grid):
+        """Store a seeded maze in the library."""
+        key = (grid.n, grid.m, grid.seed, grid.algorithm)
+        if grid.seed is None:
+            raise ValueError("Only seeded mazes can be stored in the library")
+        packed = pack_walls(grid.walls)
+        with self.lock:
+            if key in self.index:
+                return
+            if len(self.index) >= self.max_entries:
+                self._compact(len(self.index) - self.max_entries + 1)
+            self.close()
+            with open(self.path, 'r+b') as f:
+                # The current index stays as it is until the header points past it
+                offset = f.seek(0, os.SEEK_END)
+                f.write(packed.tobytes())
+                index = {**self.index, key: offset}
+                for (n, m, seed, algorithm), entry_offset in index.items():
+                    f.write(ENTRY.pack(n, m, seed, algorithm.encode(), entry_offset))
+                f.flush()
+                os.fsync(f.fileno())
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, 0, len(index), offset + packed.size))
+                f.flush()
+                os.fsync(f.fileno())
+            self._open()
+            # Each add leaves the previous index behind; compact once they outweigh the mazes
+            live = HEADER.size + sum((n * m + 1) // 2 + ENTRY.size for n, m, _, _ in self.index)
+            if len(self.map) > 2 * live:
+                self._compact()
+
+    def _compact(self, drop=0):
+        """Rewrite the library without the drop oldest mazes and the superseded indexes. Caller holds the lock."""
+        kept = list(self.index.items())[drop:]
+        blobs = [self.map[offset:offset + (n * m + 1) // 2] for (n, m, _, _), offset in kept]
+        self.close()
+        self._write([key for key, _ in kept], blobs)
+        self._open()
+
+    def load_or_generate(self, n, m, seed, algorithm='backtracking'):
+        """Load a stored maze, generating and storing it first if needed."""
+        grid = self.load(n, m, seed, algorithm)
+        if grid is None:
+            grid = generate_maze(n, m, algorithm, seed=seed)
+            self.add(grid)
+        return grid
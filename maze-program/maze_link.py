@@ -0,0 +1,192 @@
+import random
+import socket
+import threading
+import time
+
+# Link states passed to on_state
+CONNECTING = 'connecting'
+CONNECTED = 'connected'
+DISCONNECTED = 'disconnected'
+
+
+def tcp_connection(address, timeout=None):
+    """Open a TCP connection with Nagle's algorithm off, so small command frames go out at once."""
+    sock = socket.create_connection(address, timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+class MazeLink:
+    """Client connection to one of the Raspberry Pis, opened and kept open on a background thread.
+
+    Once started, the thread connects, hands what it receives to on_data, and when the connection
+    can't be opened or drops, tries again after a delay that doubles up to max_delay (with some
+    jitter, so both links don't retry in lockstep). on_state(name, state) is called on every state
+    change. Both callbacks run on the link's thread and must not touch Qt directly.
+
+    on_data gets each received chunk of bytes, or with new_parser (e.g. maze_protocol.FrameParser)
+    each message parsed from them: every connection gets its own new_parser(), whose feed(data)
+    returns the messages completed by data. An exception from either drops the connection.
+
+    connect(address, timeout) opens the connection: TCP by default, maze_udp.create_connection for
+    the UDP transport.
+
+    With read_timeout set, a link that receives nothing for that long is treated as dropped
+    (the Controller sends a heartbeat every 2 seconds, the Maze Navigator only answers commands).
+    """
+
+    def __init__(self, name, host, port, on_state=None, on_data=None, new_parser=None, connect=tcp_connection,
+                 connect_timeout=5.0, read_timeout=None, min_delay=0.5, max_delay=30.0):
+        self.name = name
+        self.host, self.port = host, port
+        self.on_state = on_state
+        self.on_data = on_data
+        self.new_parser = new_parser
+        self.connect = connect
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.min_delay, self.max_delay = min_delay, max_delay
+        self.state = DISCONNECTED
+        self.sock = None  # Open socket while connected
+        self.lock = threading.Lock()  # Guards sock between send() and the link thread
+        self.stopped = threading.Event()
+
+        # Metrics
+        self.start_time = None  # When start() was called
+        self.attempts = 0  # Connection attempts, failed or not
+        self.drops = 0  # Established connections that were lost
+        self.time_to_connect = None  # Seconds from starting the link to its first connection
+        self.recovery_times = []  # Seconds from each drop to the next connection
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start connecting in the background."""
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        if self.on_state:
+            self.on_state(self.name, state)
+
+    def _connect(self):
+        """Open the socket, or return None if the attempt failed."""
+        self.attempts += 1
+        try:
+            sock = self.connect((self.host, self.port), self.connect_timeout)
+        except OSError as e:
+            print(f"Failed to connect to {self.name} at {self.host}:{self.port}: {e}")
+            return None
+        sock.settimeout(self.read_timeout)
+        return sock
+
+    def _run(self):
+        """Link loop: connect, read until the connection drops, wait, repeat."""
+        delay = self.min_delay
+        lost_time = None  # When the last connection dropped
+        while not self.stopped.is_set():
+            self._set_state(CONNECTING)
+            sock = self._connect()
+            if sock is None:
+                self._set_state(DISCONNECTED)
+                self.stopped.wait(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, self.max_delay)
+                continue
+
+            now = time.perf_counter()
+            if lost_time is None:
+                self.time_to_connect = now - self.start_time
+                print(f"Connected to {self.name} at {self.host}:{self.port} in {self.time_to_connect:.2f}s")
+            else:
+                self.recovery_times.append(now - lost_time)
+                print(f"Reconnected to {self.name} after {self.recovery_times[-1]:.2f}s")
+            delay = self.min_delay
+            with self.lock:
+                if self.stopped.is_set():
+                    sock.close()
+                    break
+                self.sock = sock
+            self._set_state(CONNECTED)
+
+            self._read(sock)
+
+            with self.lock:
+                self.sock = None
+            sock.close()
+            if self.stopped.is_set():
+                break
+            self.drops += 1
+            lost_time = time.perf_counter()
+            self._set_state(DISCONNECTED)
+        self._set_state(DISCONNECTED)
+
+    def _read(self, sock):
+        """Pass received data to on_data until the connection closes, fails or goes quiet."""
+        parser = self.new_parser() if self.new_parser else None
+        while True:
+            try:
+                data = sock.recv(4096)
+            except socket.timeout:
+                print(f"No data from {self.name} for {self.read_timeout}s, reconnecting")
+                return
+            except OSError as e:
+                if not self.stopped.is_set():
+                    print(f"Connection to {self.name} lost: {e}")
+                return
+            if not data:
+                if not self.stopped.is_set():
+                    print(f"{self.name} closed the connection")
+                return
+            try:
+                for message in (parser.feed(data) if parser else [data]):
+                    if self.on_data:
+                        self.on_data(message)
+            except Exception as e:
+                print(f"Error handling data from {self.name}, reconnecting: {e}")
+                return
+
+    def send(self, data):
+        """Send bytes if connected. Returns whether they were sent; a failed send drops the connection."""
+        with self.lock:
+            if self.sock is None:
+                return False
+            try:
+                self.sock.sendall(data)
+                return True
+            except OSError as e:
+                print(f"Failed to send to {self.name}: {e}")
+                self._shutdown()
+                return False
+
+    def _shutdown(self):
+        """Wake the link thread out of recv so it notices the connection is gone. Caller holds the lock."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    @property
+    def connected(self):
+        return self.state == CONNECTED
+
+    def metrics(self):
+        """Connection metrics as a dict, times in seconds (None when there is nothing to measure yet)."""
+        recovery = self.recovery_times
+        return {
+            'attempts': self.attempts,
+            'drops': self.drops,
+            'time_to_connect': self.time_to_connect,
+            'recoveries': len(recovery),
+            'mean_recovery': sum(recovery) / len(recovery) if recovery else None,
+            'max_recovery': max(recovery) if recovery else None,
+        }
+
+    def close(self):
+        """Stop the link thread and close the connection."""
+        self.stopped.set()
+        with self.lock:
+            if self.sock is not None:
+                self._shutdown()
@@ -0,0 +1,124 @@
+import argparse
+import socket
+import threading
+import time
+import maze_protocol
+import maze_udp
+from maze_link import tcp_connection
+
+TRANSPORTS = ('tcp', 'udp')
+
+
+def start_echo_server(transport, loss):
+    """Start a stand-in Maze Navigator on localhost that acknowledges and completes every command at once.
+
+    Returns the listening server and its port.
+    """
+    if transport == 'udp':
+        server = maze_udp.DatagramServer('127.0.0.1', 0, drop_rate=loss)
+        port = server.sock.getsockname()[1]
+    else:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+
+    def serve():
+        conn, _ = server.accept()
+        if transport == 'tcp':
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        parser = maze_protocol.FrameParser()
+        try:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                for frame in parser.feed(data):
+                    if frame.kind == maze_protocol.COMMAND:
+                        conn.sendall(maze_protocol.ack(frame.seq))
+                        conn.sendall(maze_protocol.done(frame.seq, maze_protocol.OK))
+        except OSError:
+            pass
+        conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server, port
+
+
+def percentile(values, p):
+    """p-th percentile of sorted values (nearest rank)."""
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run(transport, loss, count, interval):
+    """Time count commands from sending them to their DONE, sent every interval seconds.
+
+    loss drops that fraction of the datagrams in both directions (UDP only). Returns a result dict
+    with latencies in milliseconds.
+    """
+    server, port = start_echo_server(transport, loss)
+    if transport == 'udp':
+        conn = maze_udp.create_connection(('127.0.0.1', port), timeout=5.0, drop_rate=loss)
+    else:
+        conn = tcp_connection(('127.0.0.1', port), timeout=5.0)
+        conn.settimeout(None)
+
+    sent_times = {}
+    latencies = []
+    finished = threading.Event()
+
+    def read():
+        parser = maze_protocol.FrameParser()
+        while len(latencies) < count:
+            data = conn.recv(4096)
+            if not data:
+                break
+            now = time.perf_counter()
+            for frame in parser.feed(data):
+                if frame.kind == maze_protocol.DONE:
+                    latencies.append(now - sent_times[frame.seq])
+        finished.set()
+
+    threading.Thread(target=read, daemon=True).start()
+    for seq in range(1, count + 1):
+        sent_times[seq] = time.perf_counter()
+        conn.sendall(maze_protocol.command(seq, 'forward'))
+        time.sleep(interval)
+    finished.wait(30)
+    retransmits = conn.retransmits + server.connection.retransmits if transport == 'udp' else None
+    conn.close()
+    server.close()
+
+    latencies = sorted(latency * 1000 for latency in latencies)
+    return {
+        'transport': transport,
+        'loss': loss,
+        'commands': count,
+        'completed': len(latencies),
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1],
+        'retransmits': retransmits,
+    }
+
+
+# Command latency over localhost, e.g. `python maze_link_bench.py --loss 0 0.01 0.05`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare command round trips (COMMAND to DONE) over TCP with "
+                                                 "TCP_NODELAY and over the maze_udp transport on localhost.")
+    parser.add_argument('--transports', nargs='+', default=list(TRANSPORTS), choices=TRANSPORTS)
+    parser.add_argument('--commands', type=int, default=2000, help="commands per run")
+    parser.add_argument('--interval', type=float, default=0.002, help="seconds between commands")
+    parser.add_argument('--loss', type=float, nargs='+', default=[0.0], help="fractions of UDP datagrams to "
+                        "drop (TCP can't drop packets from user space, so it only runs without loss)")
+    args = parser.parse_args()
+
+    print(f"{'transport':>9} {'loss':>5} {'commands':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'resent':>6}")
+    for transport in args.transports:
+        for loss in (args.loss if transport == 'udp' else [0.0]):
+            result = run(transport, loss, args.commands, args.interval)
+            if result['completed'] < result['commands']:
+                print(f"Only {result['completed']} of {result['commands']} {transport} commands completed")
+            resent = '' if result['retransmits'] is None else result['retransmits']
+            print(f"{transport:>9} {loss:>5.0%} {result['completed']:>8} {result['p50_ms']:>8.3f} "
+                  f"{result['p99_ms']:>8.3f} {result['max_ms']:>8.2f} {resent:>6}")
@@ -0,0 +1,75 @@
+from collections import deque
+import threading
+
+
+class MazePrefetcher:
+    """Keeps a small queue of ready mazes, built on a background thread while the current game is played.
+
+    build(*key) is called on the worker thread and must not touch Qt. Mazes are queued per key
+    (e.g. size, algorithm and difficulty); changing the key drops the queued mazes. on_ready(), if
+    given, is called on the worker thread whenever a maze has been queued, e.g. to emit a signal.
+    """
+
+    def __init__(self, build, key, depth=1, on_ready=None):
+        self.build = build
+        self.key = key
+        self.on_ready = on_ready
+        self.depth = depth  # Number of mazes to keep ready
+        self.ready = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """Worker loop: build mazes for the current key until the queue is full."""
+        while True:
+            with self.condition:
+                while self.running and len(self.ready) >= self.depth:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                key = self.key
+
+            try:
+                result = self.build(*key)
+            except Exception as e:
+                print(f"Maze prefetch failed: {e}")
+                with self.condition:
+                    self.condition.wait(1.0)  # Back off instead of spinning on a broken build
+                continue
+
+            with self.condition:
+                queued = key == self.key  # Drop mazes built for an outdated key
+                if queued:
+                    self.ready.append(result)
+            if queued and self.on_ready:
+                self.on_ready()
+
+    def _set_key(self, key):
+        """Switch to a new key, dropping queued mazes. Caller holds the condition."""
+        if key != self.key:
+            self.key = key
+            self.ready.clear()
+            self.condition.notify()
+
+    def set_key(self, key):
+        """Start prefetching mazes for a new key."""
+        with self.condition:
+            self._set_key(key)
+
+    def take(self, key):
+        """Return a ready maze for key without blocking, or None if none is ready yet."""
+        with self.condition:
+            self._set_key(key)
+            if not self.ready:
+                return None
+            result = self.ready.popleft()
+            self.condition.notify()  # Start building the replacement
+            return result
+
+    def stop(self):
+        """Stop the worker thread after its current build."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
@@ -0,0 +1,121 @@
+from collections import namedtuple
+import struct
+
+# Framed binary protocol spoken between maze.py, controller.py and maze-navigator.py. controller/
+# and maze-navigator/ link to this file, so all three always speak the same version.
+#
+# Frame layout:
+#   length   2 bytes, big-endian, counts everything after itself
+#   kind     1 byte, COMMAND, ACK, DONE or HEARTBEAT
+#   seq      4 bytes, big-endian sequence number chosen by the sender of the COMMAND
+#   payload  COMMAND: one command code, DONE: one outcome, otherwise empty
+# The receiver of a COMMAND answers with an ACK as soon as it has read it and with a DONE holding
+# the outcome once it is carried out, both with the command's sequence number, so commands can be
+# sent back to back without waiting for each other however TCP splits or joins them.
+
+# Message kinds
+COMMAND = 1
+ACK = 2
+DONE = 3
+HEARTBEAT = 4
+
+# Command codes, carried as the one-byte payload of a COMMAND frame
+COMMAND_CODES = {
+    'forward': 1,
+    'left': 2,
+    'right': 3,
+    'stop': 4,
+    'sync': 5,  # maze.py has rolled back after a failed command, see maze-navigator.py
+}
+COMMAND_NAMES = {code: name for name, code in COMMAND_CODES.items()}
+
+# Outcomes, carried as the one-byte payload of a DONE frame
+OK = 0
+FAILED = 1  # Carried out but did not succeed, e.g. the Maze Navigator found no line in time
+SKIPPED = 2  # Not carried out, e.g. rate limited or sent while the receiver was waiting for sync
+REJECTED = 3  # Unknown command
+STATUS_NAMES = {OK: 'ok', FAILED: 'failed', SKIPPED: 'skipped', REJECTED: 'rejected'}
+
+LENGTH = struct.Struct('!H')
+HEADER = struct.Struct('!HBI')  # Length, kind, sequence number
+MAX_PAYLOAD = 0xFFFF - (HEADER.size - LENGTH.size)
+SEQ_MASK = 0xFFFFFFFF
+
+Frame = namedtuple('Frame', ['kind', 'seq', 'payload'])
+
+
+class ProtocolError(ValueError):
+    """The peer sent bytes that are not a valid frame; the connection should be dropped."""
+
+
+def encode(kind, seq=0, payload=b''):
+    """One frame as bytes."""
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Payload of {len(payload)} bytes does not fit in a frame")
+    return HEADER.pack(HEADER.size - LENGTH.size + len(payload), kind, seq & SEQ_MASK) + payload
+
+
+def command(seq, name):
+    """COMMAND frame for a command name such as 'forward'."""
+    return encode(COMMAND, seq, bytes([COMMAND_CODES[name]]))
+
+
+def ack(seq):
+    return encode(ACK, seq)
+
+
+def done(seq, status):
+    return encode(DONE, seq, bytes([status]))
+
+
+def heartbeat():
+    return encode(HEARTBEAT)
+
+
+def command_name(frame):
+    """Name of the command in a COMMAND frame, or None if the code is unknown."""
+    return COMMAND_NAMES.get(frame.payload[0]) if len(frame.payload) == 1 else None
+
+
+def done_status(frame):
+    """Outcome carried by a DONE frame."""
+    return frame.payload[0] if frame.payload else REJECTED
+
+
+class Sequence:
+    """Sequence numbers for outgoing commands, 1, 2, 3... wrapping at 32 bits. Not thread-safe."""
+
+    def __init__(self):
+        self.last = 0
+
+    def next(self):
+        self.last = (self.last + 1) & SEQ_MASK
+        return self.last
+
+
+class FrameParser:
+    """Incremental frame reader: feed it received bytes, get back the frames they complete.
+
+    A partial frame is kept until the rest of it arrives. Use one parser per connection.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes. Returns the list of complete frames, raises ProtocolError on garbage."""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        offset = 0
+        while len(buffer) - offset >= HEADER.size:
+            length, kind, seq = HEADER.unpack_from(buffer, offset)
+            if length < HEADER.size - LENGTH.size or kind not in (COMMAND, ACK, DONE, HEARTBEAT):
+                raise ProtocolError(f"Bad frame header: length {length}, kind {kind}")
+            end = offset + LENGTH.size + length
+            if end > len(buffer):
+                break  # The rest of this frame hasn't arrived yet
+            frames.append(Frame(kind, seq, bytes(buffer[offset + HEADER.size:end])))
+            offset = end
+        del buffer[:offset]
+        return frames
@@ -0,0 +1,59 @@
+import numpy as np
+from maze_grid import WALL_BITS
+
+
+def _runs(mask):
+    """Runs of True along each row of a 2D bool array, as (row, start, end) index arrays."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def wall_runs(grid):
+    """Walls of the maze merged into straight segments, in cell units.
+
+    Returns (horizontal, vertical). horizontal holds (row line, start column, end column) arrays for
+    the lines between rows, vertical holds (column line, start row, end row) arrays for the lines
+    between columns. A wall shared by two cells is only listed once, and collinear walls that touch
+    are merged into one segment, so the maze can be drawn with far fewer lines than cells.
+    """
+    n, m = grid.n, grid.m
+    walls = grid.walls
+    horizontal = np.zeros((n + 1, m), dtype=bool)
+    horizontal[:n] |= (walls & WALL_BITS[0]).astype(bool)
+    horizontal[1:] |= (walls & WALL_BITS[2]).astype(bool)
+    vertical = np.zeros((n, m + 1), dtype=bool)
+    vertical[:, :m] |= (walls & WALL_BITS[3]).astype(bool)
+    vertical[:, 1:] |= (walls & WALL_BITS[1]).astype(bool)
+    return _runs(horizontal), _runs(vertical.T)
+
+
+# Shade of a cell in the overview image by its number of walls: open junctions light, dead ends dark
+WALL_SHADE = np.array([255 - 40 * bin(bits).count('1') for bits in range(16)], dtype=np.uint8)
+
+
+def image_pyramid(grid, smallest=64):
+    """Grayscale overview images of the maze, from one pixel per cell down to about `smallest` pixels.
+
+    Level k averages 2^k x 2^k cells into one pixel, so zoomed out views and minimaps can pick the
+    level closest to their scale instead of touching every cell.
+    """
+    level = WALL_SHADE[grid.walls]
+    levels = [level]
+    while max(level.shape) > smallest:
+        h, w = level.shape
+        padded = np.pad(level, ((0, h % 2), (0, w % 2)), mode='edge').astype(np.uint16)
+        level = ((padded[0::2, 0::2] + padded[1::2, 0::2] + padded[0::2, 1::2] + padded[1::2, 1::2] + 2) // 4).astype(np.uint8)
+        levels.append(level)
+    return levels
+
+
+def pyramid_level(levels, pixels):
+    """Index of the smallest level that still has at least `pixels` pixels along its longest side."""
+    for index in range(len(levels) - 1, -1, -1):
+        if max(levels[index].shape) >= pixels:
+            return index
+    return 0
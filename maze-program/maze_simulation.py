@@ -0,0 +1,138 @@
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import random
+import time
+import numpy as np
+from maze_grid import GENERATORS, generate_maze
+from maze_game import MazeGame, FORWARD_TIME, TURN_TIME
+from maze_solver import plan_route
+
+
+def _turn_to(game, heading):
+    """Rotate the game to face heading with the fewest turns. Returns the number of turns."""
+    delta = (heading - game.heading) % 4
+    if delta == 3:
+        game.rotate(0)
+        return 1
+    for _ in range(delta):
+        game.rotate(1)
+    return delta
+
+
+def wall_follower(game, rng, max_steps):
+    """Right-hand wall follower. Returns (forwards, turns)."""
+    forwards = turns = 0
+    while not game.is_won() and forwards + turns < max_steps:
+        # Prefer right, then straight, then left, then back
+        for offset in (1, 0, 3, 2):
+            heading = (game.heading + offset) % 4
+            if game.can_move(heading):
+                turns += _turn_to(game, heading)
+                game.move()
+                forwards += 1
+                break
+        else:
+            break  # Walled in on all sides
+    return forwards, turns
+
+
+def random_walk(game, rng, max_steps):
+    """Move to a uniformly random open neighbour each step. Returns (forwards, turns)."""
+    forwards = turns = 0
+    while not game.is_won() and forwards + turns < max_steps:
+        options = [heading for heading in range(4) if game.can_move(heading)]
+        if not options:
+            break
+        turns += _turn_to(game, options[int(rng.random() * len(options))])
+        game.move()
+        forwards += 1
+    return forwards, turns
+
+
+def optimal(game, rng, max_steps):
+    """Replay the fastest planned route. Returns (forwards, turns)."""
+    plan = plan_route(game.grid, (game.y, game.x), game.heading, (game.goal_y, game.goal_x),
+                      FORWARD_TIME, TURN_TIME)
+    forwards = turns = 0
+    for command in plan[0] if plan else []:
+        if command == "forward":
+            game.move()
+            forwards += 1
+        else:
+            game.rotate(0 if command == "left" else 1)
+            turns += 1
+    return forwards, turns
+
+
+# Agents selectable by name
+AGENTS = {
+    'wall_follower': wall_follower,
+    'random': random_walk,
+    'optimal': optimal,
+}
+
+
+def _simulate(args):
+    """Process pool worker: run every agent on one seeded maze."""
+    n, m, algorithm, seed, agents = args
+    grid = generate_maze(n, m, algorithm, seed=seed)
+    rng = random.Random(seed)
+    max_steps = 100 * n * m  # Give up on random walks that wander for too long
+    results = []
+    for agent in agents:
+        game = MazeGame(grid)
+        forwards, turns = AGENTS[agent](game, rng, max_steps)
+        results.append((n, m, agent, forwards, turns, game.is_won()))
+    return results
+
+
+def simulate(sizes, mazes, agents=tuple(AGENTS), algorithm='backtracking', first_seed=0, workers=None):
+    """Run the agents on `mazes` seeded mazes of each (n, m) size across a process pool.
+
+    Returns {((n, m), agent): stats} with command counts and estimated physical run times.
+    """
+    jobs = [(n, m, algorithm, seed, tuple(agents))
+            for n, m in sizes for seed in range(first_seed, first_seed + mazes)]
+    runs = {}
+    with ProcessPoolExecutor(workers) as executor:
+        for results in executor.map(_simulate, jobs, chunksize=max(1, len(jobs) // 64)):
+            for n, m, agent, forwards, turns, won in results:
+                runs.setdefault(((n, m), agent), []).append((forwards, turns, won))
+
+    stats = {}
+    for key, values in runs.items():
+        forwards, turns, won = (np.array(column) for column in zip(*values))
+        commands = forwards + turns
+        run_time = forwards * FORWARD_TIME + turns * TURN_TIME
+        stats[key] = {
+            'mazes': len(values),
+            'solved': float(won.mean()),
+            'forwards': float(forwards.mean()),
+            'turns': float(turns.mean()),
+            'commands': float(commands.mean()),
+            'commands_p50': float(np.percentile(commands, 50)),
+            'commands_p90': float(np.percentile(commands, 90)),
+            'run_time': float(run_time.mean()),
+        }
+    return stats
+
+
+# Agent simulation from the command line, e.g. `python maze_simulation.py --sizes 5 10 20 --mazes 1000`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate robot commands and run time per maze for each agent.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 5, 7], help="square maze sizes")
+    parser.add_argument('--mazes', type=int, default=1000, help="mazes per size")
+    parser.add_argument('--agents', nargs='+', default=list(AGENTS), choices=AGENTS.keys())
+    parser.add_argument('--algorithm', default='backtracking', choices=GENERATORS.keys())
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    stats = simulate([(size, size) for size in args.sizes], args.mazes, args.agents, args.algorithm,
+                     workers=args.workers)
+    print(f"Simulated {args.mazes * len(args.sizes)} mazes in {time.perf_counter() - start_time:.2f}s")
+    print(f"{'size':>9} {'agent':>14} {'solved':>7} {'forward':>8} {'turns':>8} {'commands':>9} "
+          f"{'p50':>7} {'p90':>7} {'est. time':>10}")
+    for ((n, m), agent), s in sorted(stats.items()):
+        print(f"{f'{n}x{m}':>9} {agent:>14} {s['solved']:>7.0%} {s['forwards']:>8.1f} {s['turns']:>8.1f} "
+              f"{s['commands']:>9.1f} {s['commands_p50']:>7.0f} {s['commands_p90']:>7.0f} {s['run_time']:>9.1f}s")
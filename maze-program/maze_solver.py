@@ -0,0 +1,223 @@
+from array import array
+import heapq
+import numpy as np
+from maze_grid import WALL_BITS, ALL_WALLS
+
+# Number of openings for each 4-bit open mask
+OPEN_COUNT = np.array([bin(bits).count('1') for bits in range(16)], dtype=np.uint8)
+
+# Direction of the only opening for single-bit open masks (-1 otherwise)
+SINGLE_OPENING = np.array([WALL_BITS.index(bits) if bits in WALL_BITS else -1 for bits in range(16)], dtype=np.int8)
+
+
+def open_mask(grid):
+    """Adjacency bitmask of a MazeGrid: bit (1 << d) is set where a cell is open in direction d."""
+    return ~grid.walls & ALL_WALLS
+
+
+def _steps(m):
+    """Flat index offset for each direction [Top, Right, Bottom, Left]."""
+    return (-m, 1, m, -1)
+
+
+def _bfs(grid, source, target=None):
+    """Breadth-first search from a flat cell index over the open passages.
+
+    Returns a flat int32 array of distances (-1 where unreached). Stops early once target is reached.
+    """
+    n, m = grid.n, grid.m
+    walls = grid.walls.tobytes()
+    steps = _steps(m)
+    dist = array('i', [-1]) * (n * m)
+    dist[source] = 0
+    queue = array('l', [source])
+    head = 0
+
+    up, right, down, left = steps
+    while head < len(queue):
+        cell = queue[head]
+        head += 1
+        if cell == target:
+            break
+        d = dist[cell] + 1
+        bits = walls[cell]
+        # Unrolled over [Top, Right, Bottom, Left]; this loop dominates on multi-million-cell mazes
+        if not bits & 1 and dist[cell + up] < 0:
+            dist[cell + up] = d
+            queue.append(cell + up)
+        if not bits & 2 and dist[cell + right] < 0:
+            dist[cell + right] = d
+            queue.append(cell + right)
+        if not bits & 4 and dist[cell + down] < 0:
+            dist[cell + down] = d
+            queue.append(cell + down)
+        if not bits & 8 and dist[cell + left] < 0:
+            dist[cell + left] = d
+            queue.append(cell + left)
+
+    return np.frombuffer(dist, dtype=np.intc)
+
+
+def _descend(grid, dist, start):
+    """Follow decreasing distances from start down to distance 0, returning the cells as (x, y)."""
+    m = grid.m
+    walls = grid.walls.reshape(-1)
+    steps = _steps(m)
+    cell = start
+    path = [divmod(cell, m)]
+    while dist[cell] > 0:
+        for wall_idx in range(4):
+            if not walls[cell] & WALL_BITS[wall_idx] and dist[cell + steps[wall_idx]] == dist[cell] - 1:
+                cell += steps[wall_idx]
+                break
+        path.append(divmod(cell, m))
+    return path
+
+
+def bfs_path(grid, start, goal):
+    """Shortest path from start to goal (both (x, y)) using BFS, or None if unreachable."""
+    m = grid.m
+    source, target = goal[0] * m + goal[1], start[0] * m + start[1]
+    dist = _bfs(grid, source, target)
+    if dist[target] < 0:
+        return None
+    return _descend(grid, dist, target)
+
+
+def astar_path(grid, start, goal):
+    """Shortest path from start to goal (both (x, y)) using A* with a Manhattan heuristic, or None."""
+    m = grid.m
+    walls = grid.walls.tobytes()
+    steps = _steps(m)
+    gx, gy = goal
+    source, target = start[0] * m + start[1], gx * m + gy
+
+    best = {source: 0}
+    came_from = {}
+    heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, source)]
+    while heap:
+        _, g, cell = heapq.heappop(heap)
+        if cell == target:
+            path = [divmod(cell, m)]
+            while cell != source:
+                cell = came_from[cell]
+                path.append(divmod(cell, m))
+            return path[::-1]
+        if g > best[cell]:
+            continue  # Stale heap entry
+        bits = walls[cell]
+        for wall_idx in range(4):
+            if not bits & WALL_BITS[wall_idx]:
+                nxt = cell + steps[wall_idx]
+                if g + 1 < best.get(nxt, g + 2):
+                    best[nxt] = g + 1
+                    came_from[nxt] = cell
+                    x, y = divmod(nxt, m)
+                    heapq.heappush(heap, (g + 1 + abs(x - gx) + abs(y - gy), g + 1, nxt))
+    return None
+
+
+def distance_field(grid, goal):
+    """Distance in cells from every cell to goal (x, y), as an (n, m) int32 array (-1 if unreachable)."""
+    return _bfs(grid, goal[0] * grid.m + goal[1]).reshape(grid.n, grid.m)
+
+
+def dead_end_fill(grid, keep):
+    """Fill dead ends in vectorized passes until only passages between the keep cells are left.
+
+    Returns the remaining open mask as an (n, m) uint8 array. For a perfect maze with keep = (start, goal)
+    the cells that are still open form the unique solution path.
+    """
+    m = grid.m
+    steps = np.array(_steps(m), dtype=np.int64)
+    opposite = np.array([ALL_WALLS ^ WALL_BITS[(d + 2) % 4] for d in range(4)], dtype=np.uint8)
+    opened = open_mask(grid).reshape(-1).copy()
+    degree = OPEN_COUNT[opened]
+    protected = np.zeros(opened.size, dtype=bool)
+    for x, y in keep:
+        protected[x * m + y] = True
+
+    candidates = np.flatnonzero(degree == 1)
+    while candidates.size:
+        candidates = np.unique(candidates[degree[candidates] == 1])
+        candidates = candidates[~protected[candidates]]
+        if not candidates.size:
+            break
+
+        # Close each dead end and the matching side of the cell it opens into
+        directions = SINGLE_OPENING[opened[candidates]]
+        neighbours = candidates + steps[directions]
+        opened[candidates] = 0
+        degree[candidates] = 0
+        np.bitwise_and.at(opened, neighbours, opposite[directions])
+        np.subtract.at(degree, neighbours, 1)
+        candidates = neighbours
+
+    return opened.reshape(grid.n, grid.m)
+
+
+def solution_mask(grid, start, goal):
+    """Boolean (n, m) mask of the cells on the solution path of a perfect maze."""
+    mask = dead_end_fill(grid, (start, goal)) != 0
+    mask[start] = mask[goal] = True
+    return mask
+
+
+class MazeHints:
+    """Precomputed distance-to-goal field and solution path, for O(1) hint lookups during play."""
+
+    def __init__(self, grid, start, goal):
+        self.distance = distance_field(grid, goal)
+
+        # The solution path is a walk down the distance field from start, no second search needed
+        self.on_path = np.zeros((grid.n, grid.m), dtype=bool)
+        if self.distance[start] >= 0:
+            for cell in _descend(grid, self.distance.reshape(-1), start[0] * grid.m + start[1]):
+                self.on_path[cell] = True
+
+    def cells_remaining(self, x, y):
+        """Number of moves from (x, y) to the goal."""
+        return int(self.distance[x, y])
+
+    def is_on_optimal_path(self, x, y):
+        """Check whether (x, y) lies on the start-to-goal solution path."""
+        return bool(self.on_path[x, y])
+
+
+def plan_route(grid, start, heading, goal, forward_time, turn_time):
+    """Fastest command sequence from start (x, y) facing heading to goal, planned over (cell, heading) states.
+
+    Costs are the measured seconds for a forward move and a 90 degree turn, so this minimizes the
+    robot's run time rather than the cell count. Returns (commands, total_time), or None if unreachable.
+    """
+    m = grid.m
+    walls = grid.walls.tobytes()
+    steps = _steps(m)
+    source = (start[0] * m + start[1]) * 4 + heading
+    target = goal[0] * m + goal[1]
+
+    best = {source: 0.0}
+    came_from = {}  # state -> (previous state, command)
+    heap = [(0.0, source)]
+    while heap:
+        cost, state = heapq.heappop(heap)
+        if cost > best[state]:
+            continue  # Stale heap entry
+        cell, facing = divmod(state, 4)
+        if cell == target:
+            commands = []
+            while state != source:
+                state, command = came_from[state]
+                commands.append(command)
+            return commands[::-1], cost
+
+        moves = [(cell * 4 + (facing - 1) % 4, 'left', turn_time),
+                 (cell * 4 + (facing + 1) % 4, 'right', turn_time)]
+        if not walls[cell] & WALL_BITS[facing]:
+            moves.append(((cell + steps[facing]) * 4 + facing, 'forward', forward_time))
+        for nxt, command, step_time in moves:
+            if cost + step_time < best.get(nxt, float('inf')):
+                best[nxt] = cost + step_time
+                came_from[nxt] = (state, command)
+                heapq.heappush(heap, (cost + step_time, nxt))
+    return None
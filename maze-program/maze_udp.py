@@ -0,0 +1,309 @@
+from collections import deque
+import random
+import socket
+import struct
+import threading
+import time
+
+# Reliable datagram transport for maze_protocol frames, an alternative to TCP for the Controller and
+# Maze Navigator links (maze.py --udp). controller/ and maze-navigator/ link to this file.
+#
+# Datagram layout: kind (1 byte), session (4 bytes), sequence number (4 bytes), payload.
+#   DATA   payload of one sendall() call, answered with an ACK carrying the same sequence number
+#   ACK    that DATA arrived
+#   NACK   a DATA with this sequence number is missing: a later one arrived first
+#   HELLO  opens a connection (the server answers with its own HELLO) and keeps it alive
+#   BYE    the connection is closed
+# Every DATA is acknowledged on its own, so a lost datagram is resent by itself (as soon as the peer
+# NACKs it, or after a timeout of about twice the round trip) rather than after TCP's 200 ms minimum
+# retransmission timeout, and there is no Nagle or delayed-ACK wait. Datagrams are delivered in
+# order, because the commands they carry have to be carried out in order, and duplicates are dropped.
+# The session, a random number per connection, keeps datagrams of an old connection out of a new one.
+DATA = 1
+ACK = 2
+NACK = 3
+HELLO = 4
+BYE = 5
+HEADER = struct.Struct('!BII')
+MAX_DATAGRAM = 1400  # Stays under the path MTU, including Tailscale's
+
+KEEPALIVE = 1.0  # Seconds between the client's HELLOs
+DEAD_TIME = 3.5  # Seconds without hearing from the peer before the connection is given up
+MIN_RTO, MAX_RTO = 0.01, 1.0  # Bounds of the retransmission timeout in seconds
+MAX_SENDS = 10  # Sends of one datagram (the first and its timed out resends) before the connection is given up
+MAX_NACKS = 32  # Missing datagrams reported at once
+TICK = 0.005  # Seconds between retransmission checks
+
+
+class DatagramConnection:
+    """One end of a reliable, in-order UDP connection, with the parts of the socket interface the links use.
+
+    sendall(data) sends data as one datagram (at most MAX_DATAGRAM bytes) and resends it until it
+    is acknowledged; recv() returns the payload of the next datagram. The socket itself is read by
+    create_connection's thread or by a DatagramServer, which pass datagrams to _receive and call
+    _tick to resend what wasn't acknowledged in time.
+
+    drop_rate drops that fraction of outgoing datagrams, to try out the retransmission.
+    """
+
+    def __init__(self, sock, peer, keepalive=False, drop_rate=0.0):
+        self.sock = sock
+        self.peer = peer
+        self.keepalive = keepalive  # The client keeps the connection alive, the server answers
+        self.drop_rate = drop_rate
+        self.session = random.getrandbits(32)
+        self.peer_session = None
+        self.condition = threading.Condition()
+        self.timeout = None
+        self.closed = False
+
+        # Sending
+        self.next_seq = 1
+        self.unacked = {}  # Sequence number -> [datagram, last send time, timeouts, resent]
+        self.rtt = None  # Smoothed round trip time in seconds
+        self.rto = 0.1  # Retransmission timeout in seconds
+        self.last_sent = 0.0
+
+        # Receiving
+        self.delivered = 0  # Sequence number of the last datagram passed to recv()
+        self.pending = {}  # Sequence number -> payload, received ahead of a missing one
+        self.highest = 0  # Highest sequence number received
+        self.inbox = deque()
+        self.last_heard = time.perf_counter()
+
+        # Metrics
+        self.retransmits = 0
+        self.duplicates = 0
+
+    def _send(self, kind, seq=0, payload=b''):
+        datagram = HEADER.pack(kind, self.session, seq) + payload
+        self.last_sent = time.perf_counter()
+        if self.drop_rate and random.random() < self.drop_rate:
+            return datagram
+        try:
+            self.sock.sendto(datagram, self.peer)
+        except OSError:
+            pass  # The datagram is lost; DATA is resent, anything else is repeated anyway
+        return datagram
+
+    def sendall(self, data):
+        if len(data) > MAX_DATAGRAM:
+            raise ValueError(f"{len(data)} bytes do not fit in one datagram")
+        with self.condition:
+            if self.closed:
+                raise BrokenPipeError("Connection closed")
+            seq = self.next_seq
+            self.next_seq += 1
+            datagram = self._send(DATA, seq, data)
+            self.unacked[seq] = [datagram, self.last_sent, 0, False]
+
+    def recv(self, bufsize=None):
+        """Payload of the next datagram, b'' once the connection is closed."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.inbox or self.closed, self.timeout):
+                raise socket.timeout("timed out")
+            return self.inbox.popleft() if self.inbox else b''
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def shutdown(self, how=None):
+        """Close the connection and tell the peer."""
+        with self.condition:
+            if not self.closed:
+                self._send(BYE)
+            self._close()
+
+    def close(self):
+        self.shutdown()
+
+    def _close(self):
+        """Mark the connection closed. Caller holds the condition."""
+        self.closed = True
+        self.condition.notify_all()
+
+    def _receive(self, kind, seq, payload):
+        """Handle a datagram from the peer."""
+        with self.condition:
+            if self.closed:
+                return
+            self.last_heard = time.perf_counter()
+            if kind == DATA:
+                self._send(ACK, seq)
+                if seq <= self.delivered or seq in self.pending:
+                    self.duplicates += 1
+                    return
+                self.pending[seq] = payload
+                if seq > self.highest + 1:  # Report the gap it opened, once; timeouts cover lost NACKs
+                    for missing in range(max(self.highest + 1, seq - MAX_NACKS), seq):
+                        self._send(NACK, missing)
+                self.highest = max(self.highest, seq)
+                while self.delivered + 1 in self.pending:
+                    self.delivered += 1
+                    self.inbox.append(self.pending.pop(self.delivered))
+                self.condition.notify_all()
+            elif kind == ACK:
+                entry = self.unacked.pop(seq, None)
+                if entry is not None and not entry[3]:  # Only time datagrams that were sent once
+                    sample = self.last_heard - entry[1]
+                    self.rtt = sample if self.rtt is None else 0.875 * self.rtt + 0.125 * sample
+                    self.rto = min(MAX_RTO, max(MIN_RTO, 2 * self.rtt))
+            elif kind == NACK:
+                entry = self.unacked.get(seq)
+                if entry is not None:
+                    self._resend(entry, timed_out=False)
+            elif kind == BYE:
+                self._close()
+
+    def _resend(self, entry, timed_out=True):
+        """Send an unacknowledged datagram again. Caller holds the condition.
+
+        Only timeouts back off and count towards MAX_SENDS: a NACK is news that the peer is there.
+        """
+        entry[1] = time.perf_counter()
+        entry[3] = True
+        if timed_out:
+            entry[2] += 1
+        self.retransmits += 1
+        if not (self.drop_rate and random.random() < self.drop_rate):
+            try:
+                self.sock.sendto(entry[0], self.peer)
+            except OSError:
+                pass
+
+    def _tick(self):
+        """Resend overdue datagrams, keep the connection alive and notice a dead peer."""
+        now = time.perf_counter()
+        with self.condition:
+            if self.closed:
+                return
+            if now - self.last_heard > DEAD_TIME:
+                print(f"No datagrams from {self.peer[0]} for {DEAD_TIME}s, closing the connection")
+                self._send(BYE)
+                self._close()
+                return
+            for entry in self.unacked.values():
+                if now - entry[1] >= min(MAX_RTO, self.rto * 2 ** entry[2]):
+                    if entry[2] + 1 >= MAX_SENDS:
+                        print(f"{self.peer[0]} did not acknowledge a datagram after {MAX_SENDS} sends, closing the connection")
+                        self._send(BYE)
+                        self._close()
+                        return
+                    self._resend(entry)
+            if self.keepalive and now - self.last_sent >= KEEPALIVE:
+                self._send(HELLO)
+
+
+def _read_datagram(sock):
+    """(kind, session, seq, payload, address) of the next datagram, or None if it timed out or is too short."""
+    try:
+        data, address = sock.recvfrom(MAX_DATAGRAM + HEADER.size)
+    except socket.timeout:
+        return None
+    except ConnectionError:
+        return None  # An ICMP error for an earlier datagram (Windows)
+    if len(data) < HEADER.size:
+        return None
+    return (*HEADER.unpack_from(data), data[HEADER.size:], address)
+
+
+def create_connection(address, timeout=None, drop_rate=0.0):
+    """Open a DatagramConnection to a DatagramServer, like socket.create_connection.
+
+    Raises socket.timeout if the server doesn't answer within timeout seconds.
+    """
+    host, port = address
+    peer = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    connection = DatagramConnection(sock, peer, keepalive=True, drop_rate=drop_rate)
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    sock.settimeout(0.2)  # Repeat the HELLO until it is answered
+    while connection.peer_session is None:
+        if deadline is not None and time.perf_counter() > deadline:
+            sock.close()
+            raise socket.timeout("timed out")
+        connection._send(HELLO)
+        datagram = _read_datagram(sock)
+        while datagram is not None:
+            kind, session, _, _, sender = datagram
+            if sender == peer and kind == HELLO:
+                connection.peer_session = session
+                break
+            datagram = _read_datagram(sock)
+    connection.last_heard = time.perf_counter()
+    threading.Thread(target=_client_loop, args=(connection,), daemon=True).start()
+    return connection
+
+
+def _client_loop(connection):
+    """Read the client's socket until its connection closes."""
+    sock = connection.sock
+    sock.settimeout(TICK)
+    while not connection.closed:
+        datagram = _read_datagram(sock)
+        if datagram is not None:
+            kind, session, seq, payload, sender = datagram
+            if sender == connection.peer and session == connection.peer_session:
+                connection._receive(kind, seq, payload)
+        connection._tick()
+    sock.close()
+
+
+class DatagramServer:
+    """UDP counterpart of a listening TCP socket with a backlog of one.
+
+    accept() returns a DatagramConnection for the next client that says HELLO. A HELLO from a new
+    client (or a restarted one) closes the current connection, as maze.py only ever has one.
+    """
+
+    def __init__(self, host, port, drop_rate=0.0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(TICK)
+        self.drop_rate = drop_rate
+        self.connection = None
+        self.accepted = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            datagram = _read_datagram(self.sock)
+            connection = self.connection
+            if datagram is not None:
+                kind, session, seq, payload, sender = datagram
+                if connection is not None and sender == connection.peer and session == connection.peer_session:
+                    if kind == HELLO and connection.closed:
+                        connection._send(BYE)  # The client has to open a new connection
+                    elif kind == HELLO:
+                        connection._send(HELLO)
+                    connection._receive(kind, seq, payload)
+                elif kind == HELLO:
+                    if connection is not None:
+                        connection.shutdown()
+                    connection = DatagramConnection(self.sock, sender, drop_rate=self.drop_rate)
+                    connection.peer_session = session
+                    connection._send(HELLO)
+                    self.connection = connection
+                    with self.condition:
+                        self.accepted.append(connection)
+                        self.condition.notify()
+            if connection is not None:
+                connection._tick()
+
+    def accept(self):
+        """Wait for a client. Returns (connection, address)."""
+        with self.condition:
+            while not self.accepted:
+                self.condition.wait(0.5)  # Short waits keep Ctrl+C working
+            connection = self.accepted.popleft()
+        return connection, connection.peer
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        if self.connection is not None:
+            self.connection.shutdown()
+        self.sock.close()
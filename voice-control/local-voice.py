@@ -18,7 +18,7 @@ class Dir(Enum):
 
 # Maze generation function
 def generate_maze(n, m):
-    """Generates an N x M maze using recursive backtracking."""
+    """Generates an N x M maze using iterative backtracking."""
     maze = [[{'visited': False, 'walls': [True, True, True, True]} for _ in range(m)] for _ in range(n)]
     # directions = [((0, -1), 0), ((0, 1), 1), ((-1, 0), 2), ((1, 0), 3)]  # [Top, Bottom, Left, Right]
     directions = [((-1, 0), 0), ((0, 1), 1), ((1, 0), 2), ((0, -1), 3)]  # [Top, Right, Bottom, Left]
@@ -30,14 +30,23 @@ def generate_maze(n, m):
         # print("(" + str(x) + ", " + str(y) + "): connected to (" + str(nx) + ", " + str(ny) + ") in direction " + str(wall_idx))
 
     def visit_cell(x, y):
-        """Main recursive function for traversing the maze."""
+        """Traverse the maze from (x, y) using an explicit stack instead of recursion."""
         maze[x][y]['visited'] = True
-        random.shuffle(directions)  # Shuffle directions for randomness
-        for (dx, dy), wall_idx in directions:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < n and 0 <= ny < m and not maze[nx][ny]['visited']:
-                remove_wall(x, y, nx, ny, wall_idx)
-                visit_cell(nx, ny)
+        stack = [(x, y)]
+        while stack:
+            x, y = stack[-1]
+            options = []
+            for (dx, dy), wall_idx in directions:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < n and 0 <= ny < m and not maze[nx][ny]['visited']:
+                    options.append((nx, ny, wall_idx))
+            if not options:
+                stack.pop()  # Dead end, backtrack
+                continue
+            nx, ny, wall_idx = random.choice(options)
+            remove_wall(x, y, nx, ny, wall_idx)
+            maze[nx][ny]['visited'] = True
+            stack.append((nx, ny))
 
     visit_cell(0, 0)  # Start at the top-left corner
     return maze